@@ -13,20 +13,27 @@
 #
 # You should have received a copy of the GNU General Public License
 # along with this program. If not, see <https://www.gnu.org/licenses/>.
-+
+
 import os
 import random
 import string
 import sqlite3
 import time
 import logging
-from flask import Flask, render_template, request, jsonify, session, g 
+import mimetypes
+from flask import Flask, render_template, request, jsonify, session, g, abort, Response, send_from_directory, url_for
 from flask_socketio import SocketIO, emit, join_room, leave_room, send
 from flask_cors import CORS
 import secrets
 import re
 import threading
 import atexit
+from config import get_config
+from tile_cache import TileCache, TileFetchError, is_valid_tile
+from assets import load_manifest, asset_url as manifest_asset_url
+from meeting import MeetSuggestionCache, compute_meet_suggestion, smooth_speed, METHODS as MEET_METHODS
+from snapshot import SnapshotError, read_snapshot, write_snapshot
+from migrations import migrate, get_schema_version
 
 # Configure logging
 logging.basicConfig(
@@ -40,8 +47,10 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 # --- Configuration & Setup ---
+app_config = get_config()
 DB_DIR = 'db'
 DB_PATH = os.path.join(DB_DIR, 'locations.db')
+SNAPSHOT_PATH = os.path.join(DB_DIR, 'live_state.snap')
 
 app = Flask(__name__)
 # Use persistent secret key from environment or file-based fallback
@@ -114,42 +123,16 @@ def close_db(error):
             logger.error(f"Error closing database: {e}")
 
 def init_db():
-    """Initializes the database and creates tables if they don't exist."""
+    """Initializes the database and brings its schema up to date (see migrations.py)."""
     try:
         conn = sqlite3.connect(DB_PATH, check_same_thread=False)
         conn.execute('PRAGMA foreign_keys = ON')  # Enable foreign key constraints
         conn.execute('PRAGMA journal_mode = WAL')  # Better concurrent access
-        cursor = conn.cursor()
         logger.info("Initializing database...")
-        
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS shares (
-                share_code TEXT PRIMARY KEY,
-                created_at INTEGER DEFAULT (CAST(strftime('%s', 'now') AS INTEGER)),
-                expires_at INTEGER DEFAULT (CAST(strftime('%s', 'now', '+24 hours') AS INTEGER))
-            )
-        ''')
-        
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS users (
-                sid TEXT PRIMARY KEY,        
-                share_code TEXT NOT NULL,    
-                username TEXT NOT NULL,         
-                color TEXT NOT NULL,         
-                lat REAL,
-                lon REAL,
-                heading REAL,
-                last_update INTEGER,         
-                FOREIGN KEY(share_code) REFERENCES shares(share_code) ON DELETE CASCADE
-            )
-        ''')
-        
-        # Add indexes for better performance
-        cursor.execute('CREATE INDEX IF NOT EXISTS idx_users_share_code ON users(share_code)')
-        cursor.execute('CREATE INDEX IF NOT EXISTS idx_shares_expires ON shares(expires_at)')
-        cursor.execute('CREATE INDEX IF NOT EXISTS idx_users_last_update ON users(last_update)')
-        
-        conn.commit()
+
+        applied = migrate(conn)
+        if applied:
+            logger.info(f"Applied schema migrations {applied}, now at version {get_schema_version(conn)}.")
         conn.close()
         logger.info("Database initialized successfully with foreign keys and WAL mode enabled.")
     except sqlite3.Error as e:
@@ -204,6 +187,40 @@ def sanitize_coordinates(lat, lon):
     except (ValueError, TypeError):
         return None, None
 
+MAX_SPEED_MPS = 100  # Anything faster is treated as a bogus reading (360 km/h)
+MAX_CLOCK_SKEW_MS = 24 * 60 * 60 * 1000  # Fix timestamps further in the future are bogus
+
+def sanitize_heading(heading):
+    """Validates an optional heading in degrees, returning None unless it is a number within 0-360."""
+    if isinstance(heading, bool):
+        return None
+    try:
+        heading = float(heading)
+    except (ValueError, TypeError):
+        return None
+    # NaN fails the range check too
+    return heading if 0 <= heading <= 360 else None
+
+def sanitize_motion(speed, timestamp):
+    """Validates optional speed (m/s) and fix timestamp (ms since epoch) used for dead reckoning."""
+    try:
+        speed = float(speed)
+        if not (0 <= speed <= MAX_SPEED_MPS):
+            speed = None
+    except (ValueError, TypeError):
+        speed = None
+
+    # Reject booleans, which are ints in Python, non-positive values, NaN and infinities,
+    # and anything too far in the future to be a real fix time
+    max_timestamp = time.time() * 1000 + MAX_CLOCK_SKEW_MS
+    if (isinstance(timestamp, bool) or not isinstance(timestamp, (int, float))
+            or not 0 < timestamp <= max_timestamp):
+        timestamp = None
+    else:
+        timestamp = int(timestamp)
+
+    return speed, timestamp
+
 def generate_easy_code(length=6):
     """Generates a simple, memorable code and ensures it's unique in the DB."""
     chars = string.ascii_uppercase
@@ -223,28 +240,52 @@ def generate_easy_code(length=6):
         if cursor.fetchone() is None:
             return code
 
-def get_next_color(share_code):
+def get_share_id(share_code):
+    """Returns the integer id of a share, or None if it doesn't exist."""
+    db = get_db()
+    row = db.execute('SELECT id FROM shares WHERE share_code = ?', (share_code,)).fetchone()
+    return row['id'] if row else None
+
+def get_next_color(share_id):
     """Assigns the next available color based on users currently in the DB for this share."""
     db = get_db()
     cursor = db.cursor()
-    cursor.execute('SELECT COUNT(*) FROM users WHERE share_code = ?', (share_code,))
+    cursor.execute('SELECT COUNT(*) FROM members WHERE share_id = ?', (share_id,))
     count = cursor.fetchone()[0]
     return USER_COLORS[count % len(USER_COLORS)]
 
+def add_member(cursor, sid, share_id, username, color, current_time, lat=None, lon=None, heading=None):
+    """Inserts a member together with their position row. The caller commits."""
+    cursor.execute('INSERT INTO members (sid, share_id, username, color) VALUES (?, ?, ?, ?)',
+                   (sid, share_id, username, color))
+    member_id = cursor.lastrowid
+    cursor.execute('''
+        INSERT INTO positions (member_id, lat, lon, heading, last_update)
+        VALUES (?, ?, ?, ?, ?)
+    ''', (member_id, lat, lon, heading, current_time))
+    return member_id
+
 def get_user_details(sid):
-    """Retrieves user details (share_code, color) from the database."""
+    """Retrieves user details (member id, share, color, username) from the database."""
     db = get_db()
     cursor = db.cursor()
-    cursor.execute('SELECT share_code, color, username FROM users WHERE sid = ?', (sid,))
-    return cursor.fetchone() 
+    cursor.execute('''
+        SELECT m.id, m.share_id, s.share_code, m.color, m.username
+        FROM members m JOIN shares s ON s.id = m.share_id
+        WHERE m.sid = ?
+    ''', (sid,))
+    return cursor.fetchone()
 
 def _get_users_in_share(share_code):
     """Helper to get active users in a specific share."""
     conn = get_db()
-    cursor = conn.execute(
-        "SELECT sid, username, color, lat, lon, heading FROM users WHERE share_code = ?",
-        (share_code,)
-    )
+    cursor = conn.execute('''
+        SELECT m.sid, m.username, m.color, p.lat, p.lon, p.heading
+        FROM shares s
+        JOIN members m ON m.share_id = s.id
+        JOIN positions p ON p.member_id = m.id
+        WHERE s.share_code = ?
+    ''', (share_code,))
     # Include username in the returned data
     users = [{'sid': row[0], 'username': row[1], 'color': row[2], 'lat': row[3], 'lon': row[4], 'heading': row[5]}
              for row in cursor.fetchall()]
@@ -271,23 +312,43 @@ def cleanup_expired_shares():
             expired_codes = [row['share_code'] for row in expired_shares]
             
             if expired_codes:
-                # Delete users in expired shares (cascade should handle this, but explicit is better)
-                cursor.execute(f'DELETE FROM users WHERE share_code IN ({",".join("?" * len(expired_codes))})', expired_codes)
-                
-                # Delete expired shares
+                # Delete expired shares; members and positions follow via ON DELETE CASCADE
                 cursor.execute(f'DELETE FROM shares WHERE share_code IN ({",".join("?" * len(expired_codes))})', expired_codes)
                 
                 db.commit()
+                for share_code in expired_codes:
+                    meet_suggestions.invalidate(share_code)
                 logger.info(f"Cleaned up {len(expired_codes)} expired shares: {expired_codes}")
             
             # Also clean up users who haven't updated location in 10 minutes
             stale_threshold = current_time - (10 * 60)  # 10 minutes
-            cursor.execute('DELETE FROM users WHERE last_update < ?', (stale_threshold,))
-            stale_users_deleted = cursor.rowcount
+            cursor.execute('''
+                SELECT m.sid, s.share_code
+                FROM members m
+                JOIN shares s ON s.id = m.share_id
+                JOIN positions p ON p.member_id = m.id
+                WHERE p.last_update < ?
+            ''', (stale_threshold,))
+            stale_members = cursor.fetchall()
             
-            if stale_users_deleted > 0:
+            if stale_members:
+                cursor.execute('''
+                    DELETE FROM members WHERE id IN (SELECT member_id FROM positions WHERE last_update < ?)
+                ''', (stale_threshold,))
                 db.commit()
-                logger.info(f"Cleaned up {stale_users_deleted} stale users")
+                for row in stale_members:
+                    recent_speeds.pop(row['sid'], None)
+                    # Cached meeting points would still include the removed members
+                    meet_suggestions.invalidate(row['share_code'])
+                logger.info(f"Cleaned up {len(stale_members)} stale users")
+
+            # Forget restored members who never reconnected
+            expired_tokens = [token for token, member in pending_rejoins.items()
+                              if member['restored_at'] < stale_threshold]
+            for token in expired_tokens:
+                del pending_rejoins[token]
+            if expired_tokens:
+                logger.info(f"Dropped {len(expired_tokens)} restored members who did not rejoin")
                 
     except Exception as e:
         logger.error(f"Error during cleanup: {e}")
@@ -304,50 +365,239 @@ def start_cleanup_scheduler():
     cleanup_thread.start()
     logger.info("Cleanup scheduler started")
 
+# Shared OSM tile cache, only used when TILE_CACHE_ENABLED is set
+tile_cache = None
+if app_config.TILE_CACHE_ENABLED:
+    tile_cache = TileCache(
+        app_config.TILE_CACHE_DIR,
+        app_config.TILE_CACHE_MAX_MB * 1024 * 1024,
+        app_config.TILE_UPSTREAM_URL
+    )
+
+# Built static assets (see assets.py); falls back to the raw files when not built
+ASSET_DIST_DIR = os.path.join(app.static_folder, 'dist')
+ASSET_MAX_AGE = 365 * 24 * 60 * 60  # Fingerprinted files never change
+asset_manifest = load_manifest(ASSET_DIST_DIR)
+
+OSM_TILE_URL = 'https://{s}.tile.openstreetmap.org/{z}/{x}/{y}.png'
+CACHED_TILE_URL = '/tiles/{z}/{x}/{y}.png'
+
+# Live share state snapshots (see snapshot.py)
+def collect_live_state():
+    """Gathers every share with its members, including restored members yet to rejoin."""
+    db = get_db()
+    shares = {}
+    for row in db.execute('SELECT share_code, created_at, expires_at FROM shares'):
+        shares[row['share_code']] = {
+            'share_code': row['share_code'],
+            'created_at': row['created_at'],
+            'expires_at': row['expires_at'],
+            'members': []
+        }
+
+    rows = db.execute('''
+        SELECT m.sid, s.share_code, m.username, m.color, p.lat, p.lon, p.heading, p.last_update
+        FROM members m
+        JOIN shares s ON s.id = m.share_id
+        JOIN positions p ON p.member_id = m.id
+    ''')
+    for row in rows:
+        token = member_tokens.get(row['sid'])
+        share = shares.get(row['share_code'])
+        if token is None or share is None:
+            continue
+        share['members'].append({
+            'token': token,
+            'username': row['username'],
+            'color': row['color'],
+            'lat': row['lat'],
+            'lon': row['lon'],
+            'heading': row['heading'],
+            'last_update': row['last_update']
+        })
+
+    for token, member in pending_rejoins.items():
+        share = shares.get(member['share_code'])
+        if share is not None:
+            share['members'].append({**member, 'token': token})
+
+    return list(shares.values())
+
+def save_snapshot():
+    """Writes the live share state to SNAPSHOT_PATH."""
+    try:
+        started = time.perf_counter()
+        with app.app_context():
+            shares = collect_live_state()
+        size = write_snapshot(SNAPSHOT_PATH, shares, USER_COLORS)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        logger.info(f"Saved snapshot of {len(shares)} shares ({size} bytes) in {elapsed_ms:.1f} ms")
+    except Exception as e:
+        # Never let one failure stop the periodic snapshots or the one at shutdown
+        logger.error(f"Failed to save snapshot: {e}")
+
+def restore_snapshot():
+    """Restores shares and members from the last snapshot so clients can rejoin after a restart."""
+    started = time.perf_counter()
+    try:
+        snapshot = read_snapshot(SNAPSHOT_PATH, USER_COLORS)
+    except (OSError, SnapshotError) as e:
+        logger.error(f"Ignoring unreadable snapshot {SNAPSHOT_PATH}: {e}")
+        snapshot = None
+
+    with app.app_context():
+        db = get_db()
+        # Socket.IO sids don't survive a restart, so any member rows left over are stale
+        db.execute('DELETE FROM members')  # Positions follow via ON DELETE CASCADE
+
+        restored_members = 0
+        if snapshot is not None:
+            _created_at, shares = snapshot
+            current_time = int(time.time())
+            stale_threshold = current_time - (10 * 60)
+            for share in shares:
+                if share['expires_at'] is not None and share['expires_at'] < current_time:
+                    continue
+                db.execute('''
+                    INSERT OR IGNORE INTO shares (share_code, created_at, expires_at)
+                    VALUES (?, COALESCE(?, CAST(strftime('%s', 'now') AS INTEGER)),
+                            COALESCE(?, CAST(strftime('%s', 'now', '+24 hours') AS INTEGER)))
+                ''', (share['share_code'], share['created_at'], share['expires_at']))
+                for member in share['members']:
+                    if (member['last_update'] or 0) < stale_threshold:
+                        continue
+                    pending_rejoins[member['token']] = {
+                        'share_code': share['share_code'],
+                        'username': member['username'],
+                        'color': member['color'],
+                        'lat': member['lat'],
+                        'lon': member['lon'],
+                        'heading': member['heading'],
+                        'last_update': member['last_update'],
+                        'restored_at': current_time
+                    }
+                    restored_members += 1
+        db.commit()
+
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    logger.info(f"Restored {restored_members} members from snapshot in {elapsed_ms:.1f} ms")
+
+def start_snapshot_scheduler():
+    """Start the periodic snapshot task in a separate thread."""
+    interval = app_config.SNAPSHOT_INTERVAL_SECONDS
+    if interval <= 0:
+        return
+
+    def snapshot_worker():
+        while True:
+            time.sleep(interval)
+            save_snapshot()
+
+    snapshot_thread = threading.Thread(target=snapshot_worker, daemon=True)
+    snapshot_thread.start()
+    logger.info(f"Snapshot scheduler started (every {interval} seconds)")
+
 # Rate limiting dictionary
 location_update_timestamps = {}
 LOCATION_UPDATE_RATE_LIMIT = 2  # seconds between updates per user
 
+# Secret rejoin token per connected user, handed out on create/join
+member_tokens = {}
+# Members restored from a snapshot, waiting to rejoin: token -> member state
+pending_rejoins = {}
+
+# Recent (smoothed) speed per user in m/s, used for meeting point ETAs
+recent_speeds = {}
+# Meeting point suggestions per share, dropped as members move or leave
+meet_suggestions = MeetSuggestionCache()
+MIN_MEET_MEMBERS = 2
+
+@app.template_global()
+def asset_url(path):
+    """Returns the fingerprinted URL for a static asset, or its plain static URL if not built."""
+    return manifest_asset_url(asset_manifest, path) or url_for('static', filename=path)
+
+def send_precompressed(filename, entry):
+    """Sends a built asset, picking a precompressed variant the client accepts."""
+    mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+    encoding = None
+    for candidate, suffix in (('br', '.br'), ('gzip', '.gz')):
+        if candidate in entry.get('encodings', ()) and request.accept_encodings[candidate]:
+            encoding = candidate
+            filename += suffix
+            break
+
+    response = send_from_directory(ASSET_DIST_DIR, filename, mimetype=mimetype)
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    response.vary.add('Accept-Encoding')
+    return response
+
 # --- Routes ---
 @app.route('/')
 def index():
     """Serves the main HTML page."""
-    return render_template('index.html')
+    tile_url = CACHED_TILE_URL if tile_cache is not None else OSM_TILE_URL
+    return render_template('index.html', tile_url=tile_url)
 
 @app.route('/offline.html')
 def offline():
     """Serves the offline page for PWA."""
     return render_template('offline.html')
 
+@app.route('/assets/<path:filename>')
+def serve_asset(filename):
+    """Serves a fingerprinted asset with long-lived immutable caching."""
+    entry = next((e for e in asset_manifest['assets'].values() if e['file'] == filename), None)
+    if entry is None:
+        abort(404)
+
+    response = send_precompressed(filename, entry)
+    response.cache_control.public = True
+    response.cache_control.max_age = ASSET_MAX_AGE
+    response.cache_control.immutable = True
+    return response
+
+@app.route('/sw.js')
+def service_worker():
+    """Serves the service worker from the root so its scope covers the whole app."""
+    entry = asset_manifest.get('service_worker')
+    if entry is not None:
+        response = send_precompressed(entry['file'], entry)
+    else:
+        response = send_from_directory(app.static_folder, 'sw.js')
+    # Browsers must always revalidate the worker to pick up new asset versions
+    response.cache_control.no_cache = True
+    response.cache_control.max_age = None
+    return response
+
+@app.route('/tiles/<int:z>/<int:x>/<int:y>.png')
+def serve_tile(z, x, y):
+    """Serves a map tile from the shared on-disk tile cache."""
+    if tile_cache is None or not is_valid_tile(z, x, y):
+        abort(404)
+
+    try:
+        data, etag = tile_cache.get(z, x, y)
+    except TileFetchError as e:
+        logger.warning(f"Tile {z}/{x}/{y} unavailable: {e}")
+        abort(502)
+
+    response = Response(data, mimetype='image/png')
+    response.set_etag(etag)
+    response.cache_control.public = True
+    response.cache_control.max_age = app_config.TILE_CACHE_MAX_AGE
+    return response.make_conditional(request)
+
 # --- SocketIO Events (Database Aware) ---
 
 @socketio.on('connect')
 def handle_connect():
     """Handles a new client connection. No DB action needed until they join/create."""
+    # Users only get a row once they create, join or rejoin a share, since
+    # share_code and color are required
     print(f'Client connected: {request.sid}')
 
-    # Simple default username generation
-    username = f"User-{request.sid[:4]}"
-    print(f"Assigning username: {username} to SID: {request.sid}")
-
-    # Add user to DB
-    conn = get_db()
-    try:
-        conn.execute("INSERT INTO users (sid, username) VALUES (?, ?)",
-                     (request.sid, username))
-        conn.commit()
-    except sqlite3.IntegrityError:
-        # User might already exist if they reconnected quickly
-        conn.execute("UPDATE users SET username = ? WHERE sid = ?",
-                     (username, request.sid))
-        conn.commit()
-        print(f"Updated existing user {request.sid} in DB")
-    except Exception as e:
-        conn.rollback()
-        print(f"Database error adding user {request.sid}: {e}")
-        # Handle error appropriately, maybe disconnect user or send error message
-        return # Or raise an error
-
 @socketio.on('disconnect')
 def handle_disconnect():
     """Handles a client disconnection. Remove user from DB and notify room."""
@@ -358,23 +608,26 @@ def handle_disconnect():
         db = get_db()
         cursor = db.cursor()
 
-        cursor.execute('SELECT share_code FROM users WHERE sid = ?', (sid,))
-        result = cursor.fetchone()
+        result = get_user_details(sid)
 
         if result:
             share_code = result['share_code']
+            share_id = result['share_id']
             print(f'User {sid} was in share {share_code}. Removing from DB.')
 
-            cursor.execute('DELETE FROM users WHERE sid = ?', (sid,))
+            cursor.execute('DELETE FROM members WHERE id = ?', (result['id'],))
             db.commit()
+            recent_speeds.pop(sid, None)
+            member_tokens.pop(sid, None)
+            meet_suggestions.invalidate(share_code)
 
             emit('user_left', {'sid': sid}, room=share_code)
 
-            cursor.execute('SELECT COUNT(*) FROM users WHERE share_code = ?', (share_code,))
+            cursor.execute('SELECT COUNT(*) FROM members WHERE share_id = ?', (share_id,))
             user_count = cursor.fetchone()[0]
             if user_count == 0:
                 print(f'Share {share_code} is now empty. Removing from shares table.')
-                cursor.execute('DELETE FROM shares WHERE share_code = ?', (share_code,))
+                cursor.execute('DELETE FROM shares WHERE id = ?', (share_id,))
                 db.commit()
             else:
                 emit_user_list_update(share_code)
@@ -390,21 +643,19 @@ def handle_create_share():
         cursor = db.cursor()
 
         share_code = generate_easy_code()
-        color = get_next_color(share_code) 
+        color = USER_COLORS[0]  # First member of a new share
         current_time = int(time.time())
         default_username = f"User-{user_sid[:4]}"
 
         try:
             cursor.execute('INSERT INTO shares (share_code, created_at) VALUES (?, ?)', (share_code, current_time))
-            cursor.execute('''
-                INSERT INTO users (sid, share_code, color, username, last_update)
-                VALUES (?, ?, ?, ?, ?)
-            ''', (user_sid, share_code, color, default_username, current_time))
+            add_member(cursor, user_sid, cursor.lastrowid, default_username, color, current_time)
             db.commit()
 
             join_room(share_code) 
+            token = member_tokens[user_sid] = secrets.token_hex(16)
             print(f'User {user_sid} ({default_username}) created share {share_code} and was added to DB.')
-            emit('share_created', {'share_code': share_code, 'sid': user_sid, 'color': color, 'username': default_username})
+            emit('share_created', {'share_code': share_code, 'sid': user_sid, 'color': color, 'username': default_username, 'token': token})
             emit_user_list_update(share_code)
 
         except sqlite3.Error as e:
@@ -432,26 +683,25 @@ def handle_join_share(data):
         db = get_db()
         cursor = db.cursor()
 
-        cursor.execute('SELECT 1 FROM shares WHERE share_code = ?', (share_code,))
-        if cursor.fetchone():
+        share_id = get_share_id(share_code)
+        if share_id is not None:
             try:
                 default_username = f"User-{user_sid[:4]}"
-                color = get_next_color(share_code)
+                color = get_next_color(share_id)
                 current_time = int(time.time())
-                cursor.execute('''
-                    INSERT INTO users (sid, share_code, color, username, last_update)
-                    VALUES (?, ?, ?, ?, ?)
-                ''', (user_sid, share_code, color, default_username, current_time))
+                add_member(cursor, user_sid, share_id, default_username, color, current_time)
                 db.commit()
 
                 join_room(share_code) 
+                token = member_tokens[user_sid] = secrets.token_hex(16)
                 logger.info(f'User {user_sid} ({default_username}) joined share {share_code}')
-                emit('joined_share', {'share_code': share_code, 'sid': user_sid, 'color': color, 'username': default_username})
+                emit('joined_share', {'share_code': share_code, 'sid': user_sid, 'color': color, 'username': default_username, 'token': token})
 
                 cursor.execute('''
-                    SELECT sid, username, lat, lon, heading, color FROM users
-                    WHERE share_code = ? AND sid != ? AND lat IS NOT NULL
-                ''', (share_code, user_sid))
+                    SELECT m.sid, m.username, p.lat, p.lon, p.heading, m.color
+                    FROM members m JOIN positions p ON p.member_id = m.id
+                    WHERE m.share_id = ? AND m.sid != ? AND p.lat IS NOT NULL
+                ''', (share_id, user_sid))
                 existing_users = cursor.fetchall()
                 existing_users_data = {row['sid']: {'username': row['username'], 'lat': row['lat'], 'lon': row['lon'], 'heading': row['heading'], 'color': row['color']} for row in existing_users}
 
@@ -471,7 +721,8 @@ def handle_join_share(data):
                  join_room(share_code)
                  user_details = get_user_details(user_sid)
                  if user_details:
-                     emit('joined_share', {'share_code': user_details['share_code'], 'sid': user_sid, 'color': user_details['color'], 'username': user_details['username']})
+                     token = member_tokens.setdefault(user_sid, secrets.token_hex(16))
+                     emit('joined_share', {'share_code': user_details['share_code'], 'sid': user_sid, 'color': user_details['color'], 'username': user_details['username'], 'token': token})
                      emit_user_list_update(user_details['share_code'])
                  else: 
                      emit('join_error', {'message': 'Error re-joining share.'})
@@ -484,13 +735,64 @@ def handle_join_share(data):
             logger.warning(f'User {user_sid} failed to join non-existent share {share_code}')
             emit('join_error', {'message': f'Share code "{share_code}" not found.'})
 
+@socketio.on('rejoin_share')
+def handle_rejoin_share(data):
+    """Lets a client that lost its connection (e.g. to a server restart) rejoin as the same member."""
+    user_sid = request.sid
+    if not isinstance(data, dict):
+        emit('join_error', {'message': 'Invalid request.'})
+        return
+    share_code = validate_share_code(data.get('share_code'))
+    token = data.get('token')
+
+    member = pending_rejoins.get(token) if isinstance(token, str) else None
+    if member is None or member['share_code'] != share_code:
+        # Not restored from a snapshot (or the grace period passed): join as a new member
+        handle_join_share({'share_code': share_code})
+        return
+
+    with app.app_context():
+        db = get_db()
+        cursor = db.cursor()
+        current_time = int(time.time())
+        share_id = get_share_id(share_code)
+        if share_id is None:
+            # The share expired while we were down
+            del pending_rejoins[token]
+            handle_join_share({'share_code': share_code})
+            return
+        try:
+            add_member(cursor, user_sid, share_id, member['username'], member['color'], current_time,
+                       member['lat'], member['lon'], member['heading'])
+            db.commit()
+        except sqlite3.Error as e:
+            db.rollback()
+            logger.error(f"Database error on rejoin_share: {e}")
+            emit('join_error', {'message': 'Failed to rejoin share due to a database error.'})
+            return
+
+        del pending_rejoins[token]
+        member_tokens[user_sid] = token
+        join_room(share_code)
+        logger.info(f"User {user_sid} ({member['username']}) rejoined share {share_code}")
+        emit('joined_share', {'share_code': share_code, 'sid': user_sid, 'color': member['color'],
+                              'username': member['username'], 'token': token, 'rejoined': True})
+
+        user_data = {'lat': member['lat'], 'lon': member['lon'], 'heading': member['heading'],
+                     'color': member['color'], 'username': member['username']}
+        emit('user_joined', {'sid': user_sid, 'data': user_data}, room=share_code, skip_sid=user_sid)
+        meet_suggestions.invalidate(share_code)
+        emit_user_list_update(share_code)
+
 @socketio.on('location_update')
 def handle_location_update(data):
     """Receives location update, updates DB, and broadcasts to room."""
     user_sid = request.sid
     lat = data.get('lat')
     lon = data.get('lon')
-    heading = data.get('heading')
+    heading = sanitize_heading(data.get('heading'))
+    # Optional motion data lets other clients extrapolate between fixes
+    speed, fix_timestamp = sanitize_motion(data.get('speed'), data.get('timestamp'))
 
     # Validate coordinates
     lat, lon = sanitize_coordinates(lat, lon)
@@ -511,27 +813,30 @@ def handle_location_update(data):
         cursor = db.cursor()
 
         try:
-            cursor.execute('SELECT share_code, color FROM users WHERE sid = ?', (user_sid,))
-            user_info = cursor.fetchone()
+            user_info = get_user_details(user_sid)
 
             if user_info:
                 share_code = user_info['share_code']
                 color = user_info['color']
 
+                # Only the narrow positions row is rewritten on each update
                 cursor.execute('''
-                    UPDATE users SET lat = ?, lon = ?, heading = ?, last_update = ?
-                    WHERE sid = ?
-                ''', (lat, lon, heading, current_time, user_sid))
+                    UPDATE positions SET lat = ?, lon = ?, heading = ?, last_update = ?
+                    WHERE member_id = ?
+                ''', (lat, lon, heading, current_time, user_info['id']))
                 db.commit()
+                recent_speeds[user_sid] = smooth_speed(recent_speeds.get(user_sid), speed)
+                meet_suggestions.note_location(share_code, user_sid, lat, lon)
 
-                user_details = get_user_details(user_sid)
                 broadcast_data = {
                     'sid': user_sid,
                     'lat': lat,
                     'lon': lon,
                     'heading': heading,
+                    'speed': speed,
+                    'timestamp': fix_timestamp,
                     'color': color,
-                    'username': user_details['username']
+                    'username': user_info['username']
                 }
 
                 emit('location_broadcast', broadcast_data, room=share_code, skip_sid=user_sid)
@@ -544,9 +849,63 @@ def handle_location_update(data):
             db.rollback()
             logger.error(f"Database error on location_update for {user_sid}: {e}")
 
+@socketio.on('meet_suggestion')
+def handle_meet_suggestion(data=None):
+    """Suggests a meeting point for the caller's share with per-member distance, bearing and ETA."""
+    user_sid = request.sid
+    if data is None:
+        data = {}
+    if not isinstance(data, dict):
+        emit('meet_suggestion_error', {'message': 'Invalid request.'})
+        return
+    method = data.get('method', 'median')
+    if not isinstance(method, str) or method not in MEET_METHODS:
+        emit('meet_suggestion_error', {'message': f'Unknown method "{method}". Use one of: {", ".join(MEET_METHODS)}.'})
+        return
+
+    with app.app_context():
+        user_details = get_user_details(user_sid)
+        if not user_details or not user_details['share_code']:
+            emit('meet_suggestion_error', {'message': 'You are not in a share.'})
+            return
+        share_code = user_details['share_code']
+
+        suggestion = meet_suggestions.get(share_code, method)
+        if suggestion is None:
+            members = [
+                {**user, 'speed': recent_speeds.get(user['sid'])}
+                for user in _get_users_in_share(share_code)
+                if user['lat'] is not None and user['lon'] is not None
+            ]
+            if len(members) < MIN_MEET_MEMBERS:
+                emit('meet_suggestion_error', {'message': 'At least two members need to share their location.'})
+                return
+
+            suggestion = compute_meet_suggestion(members, method)
+            suggestion['share_code'] = share_code
+            meet_suggestions.put(share_code, method, suggestion, members)
+            logger.debug(f"Computed {method} meeting point for share {share_code} from {len(members)} members")
+
+        emit('meet_suggestion', suggestion)
+
 # --- Main Execution ---
-if __name__ == '__main__':
-    init_db() 
+def init_app():
+    """Prepares the database, restores live state and starts background tasks.
+
+    Used by both `python app.py` and gunicorn (`app:init_app()`).
+    """
+    init_db()
+    restore_snapshot()
     start_cleanup_scheduler()  # Start the background cleanup task
+    start_snapshot_scheduler()
+    atexit.register(save_snapshot)  # Snapshot on shutdown for a fast warm restart
+    return app
+
+if __name__ == '__main__':
+    # debug=True runs the Werkzeug reloader: a watcher process that never serves requests
+    # re-runs this module in a child with WERKZEUG_RUN_MAIN set. Only the serving child may
+    # restore and snapshot live state, or the watcher overwrites it with its own empty state.
+    if os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        init_app()
     logger.info("Starting Flask-SocketIO server...")
     socketio.run(app, host='0.0.0.0', port=5000, debug=True)
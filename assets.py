@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+Static asset pipeline for SimpleMeet.
+
+Minifies, content-hashes and precompresses (gzip, and brotli when available)
+the front-end assets into static/dist, and writes an asset manifest mapping
+each source path to its fingerprinted file. The service worker is rendered
+from static/sw.js with its cache name and precache list taken from that
+manifest. Run it before deploying:
+
+    python assets.py
+"""
+import argparse
+import gzip
+import hashlib
+import json
+import logging
+import os
+import re
+
+try:
+    import rjsmin
+except ImportError:
+    rjsmin = None
+
+try:
+    import rcssmin
+except ImportError:
+    rcssmin = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+# Source paths relative to the static folder that get fingerprinted
+FINGERPRINTED_ASSETS = [
+    'js/main.js',
+    'css/style.css',
+]
+SERVICE_WORKER = 'sw.js'
+MANIFEST_NAME = 'asset-manifest.json'
+ASSET_URL_PREFIX = '/assets/'
+HASH_LENGTH = 10
+
+# Only keep compressed variants that are meaningfully smaller
+MIN_COMPRESSION_SAVING = 0.9
+
+
+def minify(path, text):
+    """Minifies JS or CSS source, returning it unchanged if no minifier is installed."""
+    if path.endswith('.js') and rjsmin is not None:
+        return rjsmin.jsmin(text)
+    if path.endswith('.css') and rcssmin is not None:
+        return rcssmin.cssmin(text)
+    return text
+
+
+def fingerprint(path, data):
+    """Inserts a content hash before the extension: js/main.js -> js/main.<hash>.js"""
+    digest = hashlib.sha256(data).hexdigest()[:HASH_LENGTH]
+    root, ext = os.path.splitext(path)
+    return f'{root}.{digest}{ext}'
+
+
+def write_with_variants(out_path, data):
+    """Writes a file plus .gz and .br siblings, returning the encodings written."""
+    os.makedirs(os.path.dirname(out_path), exist_ok=True)
+    with open(out_path, 'wb') as f:
+        f.write(data)
+
+    encodings = []
+    compressors = [('gzip', '.gz', lambda d: gzip.compress(d, compresslevel=9, mtime=0))]
+    if brotli is not None:
+        compressors.append(('br', '.br', lambda d: brotli.compress(d, quality=11)))
+
+    for encoding, suffix, compress in compressors:
+        compressed = compress(data)
+        if len(compressed) < len(data) * MIN_COMPRESSION_SAVING:
+            with open(out_path + suffix, 'wb') as f:
+                f.write(compressed)
+            encodings.append(encoding)
+        elif os.path.exists(out_path + suffix):
+            os.remove(out_path + suffix)
+    return encodings
+
+
+def asset_url(manifest, path):
+    """Returns the fingerprinted URL for a static path, or None if it isn't in the manifest."""
+    entry = manifest.get('assets', {}).get(path)
+    if entry is None:
+        return None
+    return ASSET_URL_PREFIX + entry['file']
+
+
+def render_service_worker(source, manifest):
+    """Points the service worker's cache name and precache list at the built assets."""
+    cache_name = f"simplemeet-{manifest['version']}"
+    source, count = re.subn(r"const CACHE_NAME = '[^']*';",
+                            f"const CACHE_NAME = '{cache_name}';", source, count=1)
+    if count != 1:
+        raise ValueError("Could not find CACHE_NAME in service worker source")
+
+    def replace_precache(match):
+        urls = []
+        for url in re.findall(r"'([^']*)'", match.group(1)):
+            if url.startswith('/static/'):
+                url = asset_url(manifest, url[len('/static/'):]) or url
+            urls.append(url)
+        return 'const STATIC_CACHE_ASSETS = ' + json.dumps(urls, indent=4) + ';'
+
+    source, count = re.subn(r"const STATIC_CACHE_ASSETS = \[(.*?)\];", replace_precache,
+                            source, count=1, flags=re.S)
+    if count != 1:
+        raise ValueError("Could not find STATIC_CACHE_ASSETS in service worker source")
+    return source
+
+
+def build(static_dir, out_dir):
+    """Builds all assets into out_dir and returns the manifest that was written."""
+    manifest = {'assets': {}}
+    version = hashlib.sha256()
+
+    for path in FINGERPRINTED_ASSETS:
+        with open(os.path.join(static_dir, path), 'r', encoding='utf-8') as f:
+            data = minify(path, f.read()).encode('utf-8')
+        hashed_path = fingerprint(path, data)
+        encodings = write_with_variants(os.path.join(out_dir, hashed_path), data)
+        manifest['assets'][path] = {'file': hashed_path, 'size': len(data), 'encodings': encodings}
+        version.update(hashed_path.encode('utf-8'))
+        logger.info(f"Built {path} -> {hashed_path} ({len(data)} bytes, {', '.join(encodings) or 'uncompressed'})")
+
+    # The service worker must keep a stable URL, so it is rendered but not fingerprinted
+    manifest['version'] = version.hexdigest()[:HASH_LENGTH]
+    with open(os.path.join(static_dir, SERVICE_WORKER), 'r', encoding='utf-8') as f:
+        sw_source = render_service_worker(f.read(), manifest)
+    sw_data = minify(SERVICE_WORKER, sw_source).encode('utf-8')
+    encodings = write_with_variants(os.path.join(out_dir, SERVICE_WORKER), sw_data)
+    manifest['service_worker'] = {'file': SERVICE_WORKER, 'size': len(sw_data), 'encodings': encodings}
+
+    with open(os.path.join(out_dir, MANIFEST_NAME), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    logger.info(f"Wrote asset manifest version {manifest['version']} to {out_dir}")
+    return manifest
+
+
+def load_manifest(out_dir):
+    """Loads the asset manifest, returning an empty one if assets haven't been built."""
+    try:
+        with open(os.path.join(out_dir, MANIFEST_NAME), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {'assets': {}}
+    except (OSError, ValueError) as e:
+        logger.warning(f"Ignoring unreadable asset manifest in {out_dir}: {e}")
+        return {'assets': {}}
+
+
+def main(argv=None):
+    """Command line entry point for building the static assets."""
+    base_dir = os.path.dirname(os.path.abspath(__file__))
+    parser = argparse.ArgumentParser(description="Build minified, fingerprinted and precompressed static assets")
+    parser.add_argument('--static-dir', default=os.path.join(base_dir, 'static'))
+    parser.add_argument('--out-dir', default=os.path.join(base_dir, 'static', 'dist'))
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(levelname)s - %(message)s')
+    for module, name in ((rjsmin, 'rjsmin'), (rcssmin, 'rcssmin'), (brotli, 'brotli')):
+        if module is None:
+            logger.warning(f"{name} is not installed; continuing without it")
+
+    manifest = build(args.static_dir, args.out_dir)
+    print(f"✅ Built {len(manifest['assets'])} assets (version {manifest['version']}) into {args.out_dir}")
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Benchmark the database cost of a single location update per schema version.
+
+Each location update is committed on its own, as the server does. With WAL
+checkpoints disabled, every page a commit touches is appended to the WAL
+as one frame, so WAL frames per update is the write amplification.
+
+    python benchmarks/bench_location_update.py [--members 2000] [--updates 5000]
+"""
+import argparse
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from migrations import SCHEMA_VERSION, migrate
+
+WAL_HEADER_SIZE = 32
+WAL_FRAME_HEADER_SIZE = 24
+MEMBERS_PER_SHARE = 5
+
+
+def _populate(conn, version, members):
+    """Fills the database with shares and members that have a position."""
+    now = int(time.time())
+    # Socket.IO sids are random strings, so they land all over the users b-tree
+    sids = [f'{random.getrandbits(80):020x}' for _ in range(members)]
+    for i, sid in enumerate(sids):
+        code = f'S{i // MEMBERS_PER_SHARE:06d}'
+        if version == 1:
+            conn.execute('INSERT OR IGNORE INTO shares (share_code, created_at) VALUES (?, ?)', (code, now))
+            conn.execute('''
+                INSERT INTO users (sid, share_code, username, color, lat, lon, heading, last_update)
+                VALUES (?, ?, ?, '#E6194B', 52.5, 13.4, 0, ?)
+            ''', (sid, code, f'User-{i}', now))
+        else:
+            conn.execute('INSERT OR IGNORE INTO shares (share_code, created_at) VALUES (?, ?)', (code, now))
+            share_id = conn.execute('SELECT id FROM shares WHERE share_code = ?', (code,)).fetchone()[0]
+            cursor = conn.execute("INSERT INTO members (sid, share_id, username, color) VALUES (?, ?, ?, '#E6194B')",
+                                  (sid, share_id, f'User-{i}'))
+            conn.execute('INSERT INTO positions (member_id, lat, lon, heading, last_update) VALUES (?, 52.5, 13.4, 0, ?)',
+                         (cursor.lastrowid, now))
+    conn.commit()
+    return sids
+
+
+def _update_statement(conn, version, sid):
+    """Returns the UPDATE the server issues for a member in the given schema version."""
+    if version == 1:
+        return ('UPDATE users SET lat = ?, lon = ?, heading = ?, last_update = ? WHERE sid = ?', sid)
+    member_id = conn.execute('SELECT id FROM members WHERE sid = ?', (sid,)).fetchone()[0]
+    return ('UPDATE positions SET lat = ?, lon = ?, heading = ?, last_update = ? WHERE member_id = ?', member_id)
+
+
+def measure(version, members=2000, updates=5000, seed=1):
+    """Runs location updates against a schema version and returns per-update costs."""
+    random.seed(seed)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, 'bench.db')
+        conn = sqlite3.connect(path)
+        conn.execute('PRAGMA journal_mode = WAL')
+        conn.execute('PRAGMA wal_autocheckpoint = 0')
+        migrate(conn, target=version)
+        sids = _populate(conn, version, members)
+        page_size = conn.execute('PRAGMA page_size').fetchone()[0]
+        conn.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+
+        statements = [_update_statement(conn, version, random.choice(sids)) for _ in range(updates)]
+        started = time.perf_counter()
+        last_update = int(time.time())
+        for sql, key in statements:
+            last_update += 1
+            conn.execute(sql, (random.uniform(-90, 90), random.uniform(-180, 180), random.uniform(0, 360),
+                               last_update, key))
+            conn.commit()
+        elapsed = time.perf_counter() - started
+
+        wal_bytes = os.path.getsize(path + '-wal') - WAL_HEADER_SIZE
+        conn.close()
+
+    frames = wal_bytes / (page_size + WAL_FRAME_HEADER_SIZE)
+    return {
+        'version': version,
+        'pages_per_update': frames / updates,
+        'bytes_per_update': wal_bytes / updates,
+        'us_per_update': elapsed / updates * 1e6
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure write amplification of location updates per schema version")
+    parser.add_argument('--members', type=int, default=2000)
+    parser.add_argument('--updates', type=int, default=5000)
+    args = parser.parse_args(argv)
+
+    results = [measure(version, args.members, args.updates) for version in range(1, SCHEMA_VERSION + 1)]
+    print(f"Location update cost with {args.members} members, {args.updates} updates (one commit each)")
+    print(f"{'schema':>8} {'pages/update':>14} {'WAL bytes/update':>18} {'us/update':>11}")
+    for result in results:
+        print(f"{'v' + str(result['version']):>8} {result['pages_per_update']:>14.2f} "
+              f"{result['bytes_per_update']:>18.0f} {result['us_per_update']:>11.1f}")
+
+    baseline, latest = results[0], results[-1]
+    reduction = 1 - latest['pages_per_update'] / baseline['pages_per_update']
+    print(f"\nv{latest['version']} writes {reduction:.0%} fewer pages per update than v{baseline['version']}")
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
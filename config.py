@@ -31,6 +31,9 @@ class Config:
     CLEANUP_INTERVAL_MINUTES: int = int(os.environ.get('CLEANUP_INTERVAL_MINUTES', 30))
     STALE_USER_TIMEOUT_MINUTES: int = int(os.environ.get('STALE_USER_TIMEOUT_MINUTES', 10))
     
+    # Live state snapshots for fast warm restarts
+    SNAPSHOT_INTERVAL_SECONDS: int = int(os.environ.get('SNAPSHOT_INTERVAL_SECONDS', 60))
+    
     # Server settings
     HOST: str = os.environ.get('HOST', '0.0.0.0')
     PORT: int = int(os.environ.get('PORT', 5000))
@@ -42,6 +45,13 @@ class Config:
     # Logging
     LOG_LEVEL: str = os.environ.get('LOG_LEVEL', 'INFO')
     LOG_FILE: str = os.environ.get('LOG_FILE', 'simplemeet.log')
+    
+    # Shared map tile cache (serves /tiles/<z>/<x>/<y>.png when enabled)
+    TILE_CACHE_ENABLED: bool = os.environ.get('TILE_CACHE_ENABLED', 'False').lower() == 'true'
+    TILE_CACHE_DIR: str = os.environ.get('TILE_CACHE_DIR', os.path.join(DB_DIR, 'tiles'))
+    TILE_CACHE_MAX_MB: int = int(os.environ.get('TILE_CACHE_MAX_MB', 512))
+    TILE_CACHE_MAX_AGE: int = int(os.environ.get('TILE_CACHE_MAX_AGE', 7 * 24 * 60 * 60))  # seconds
+    TILE_UPSTREAM_URL: str = os.environ.get('TILE_UPSTREAM_URL', 'https://tile.openstreetmap.org/{z}/{x}/{y}.png')
 
 class DevelopmentConfig(Config):
     """Development configuration."""
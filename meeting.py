@@ -0,0 +1,176 @@
+"""
+Meeting point suggestions for a share.
+
+Given the last known positions of every member, computes a place to meet
+(the geometric median, which minimizes total travel distance, or the
+plain centroid) plus each member's distance, bearing and a rough ETA to
+it. Everything is vectorized with NumPy over all members at once.
+"""
+import threading
+
+import numpy as np
+
+EARTH_RADIUS_M = 6371000.0
+WALKING_SPEED_MPS = 1.4  # Assumed for members who are stationary or report no speed
+MIN_MOVING_SPEED_MPS = 0.5  # Slower than this counts as standing still
+SPEED_SMOOTHING = 0.3  # Weight of the newest reading in the recent speed average
+
+# A cached suggestion is kept while no member has moved further than this
+INVALIDATE_DISTANCE_M = 10.0
+
+METHODS = ('median', 'centroid')
+
+MEDIAN_TOLERANCE_M = 0.5
+MEDIAN_MAX_ITERATIONS = 100
+
+
+def smooth_speed(previous, speed):
+    """Folds a new speed reading into a member's recent speed average."""
+    if speed is None:
+        return previous
+    if previous is None:
+        return speed
+    return previous + SPEED_SMOOTHING * (speed - previous)
+
+
+def _wrap_lon(lon):
+    """Wraps longitudes (or longitude differences) into [-180, 180)."""
+    return (lon + 180) % 360 - 180
+
+
+def _project(lats, lons, origin_lat, origin_lon):
+    """Projects degrees to local x/y meters around an origin (equirectangular)."""
+    x = np.radians(_wrap_lon(lons - origin_lon)) * np.cos(np.radians(origin_lat)) * EARTH_RADIUS_M
+    y = np.radians(lats - origin_lat) * EARTH_RADIUS_M
+    return np.column_stack((x, y))
+
+
+def _unproject(point, origin_lat, origin_lon):
+    lat = origin_lat + np.degrees(point[1] / EARTH_RADIUS_M)
+    lon = origin_lon + np.degrees(point[0] / (EARTH_RADIUS_M * np.cos(np.radians(origin_lat))))
+    return float(lat), float(_wrap_lon(lon))
+
+
+def centroid(lats, lons):
+    """Returns the mean position, averaging longitudes on the unit circle to handle the antimeridian."""
+    lon_rad = np.radians(lons)
+    lon = np.degrees(np.arctan2(np.sin(lon_rad).mean(), np.cos(lon_rad).mean()))
+    return float(np.mean(lats)), float(lon)
+
+
+def geometric_median(lats, lons):
+    """Returns the point minimizing the summed distance to all positions (Weiszfeld's algorithm)."""
+    origin_lat, origin_lon = centroid(lats, lons)
+    points = _project(lats, lons, origin_lat, origin_lon)
+    estimate = points.mean(axis=0)
+
+    for _ in range(MEDIAN_MAX_ITERATIONS):
+        distances = np.linalg.norm(points - estimate, axis=1)
+        # Avoid dividing by zero when the estimate lands on a member
+        weights = 1.0 / np.maximum(distances, 1e-6)
+        new_estimate = (points * weights[:, None]).sum(axis=0) / weights.sum()
+        if np.linalg.norm(new_estimate - estimate) < MEDIAN_TOLERANCE_M:
+            estimate = new_estimate
+            break
+        estimate = new_estimate
+
+    return _unproject(estimate, origin_lat, origin_lon)
+
+
+def haversine_m(lats, lons, lat, lon):
+    """Great-circle distances in meters from each position to (lat, lon)."""
+    lat1, lon1 = np.radians(lats), np.radians(lons)
+    lat2, lon2 = np.radians(lat), np.radians(lon)
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def initial_bearing_deg(lats, lons, lat, lon):
+    """Compass bearings (0-360, 0 = north) from each position toward (lat, lon)."""
+    lat1, lon1 = np.radians(lats), np.radians(lons)
+    lat2, lon2 = np.radians(lat), np.radians(lon)
+    dlon = lon2 - lon1
+    x = np.sin(dlon) * np.cos(lat2)
+    y = np.cos(lat1) * np.sin(lat2) - np.sin(lat1) * np.cos(lat2) * np.cos(dlon)
+    return (np.degrees(np.arctan2(x, y)) + 360.0) % 360.0
+
+
+def compute_meet_suggestion(members, method='median'):
+    """Computes a meeting point and per-member distance, bearing and ETA.
+
+    members is a list of dicts with sid, username, lat, lon and an optional
+    recent speed in m/s. Returns a JSON-serializable dict.
+    """
+    if method not in METHODS:
+        raise ValueError(f"Unknown meeting point method: {method}")
+    if not members:
+        raise ValueError("No member positions to compute a meeting point from")
+
+    lats = np.array([m['lat'] for m in members], dtype=float)
+    lons = np.array([m['lon'] for m in members], dtype=float)
+    speeds = np.array([m.get('speed') if m.get('speed') is not None else np.nan for m in members], dtype=float)
+
+    if method == 'median':
+        lat, lon = geometric_median(lats, lons)
+    else:
+        lat, lon = centroid(lats, lons)
+
+    distances = haversine_m(lats, lons, lat, lon)
+    bearings = initial_bearing_deg(lats, lons, lat, lon)
+    moving = np.nan_to_num(speeds, nan=0.0) >= MIN_MOVING_SPEED_MPS
+    etas = distances / np.where(moving, speeds, WALKING_SPEED_MPS)
+
+    return {
+        'method': method,
+        'lat': lat,
+        'lon': lon,
+        'members': [
+            {
+                'sid': m['sid'],
+                'username': m.get('username'),
+                'distance_m': round(float(distance), 1),
+                'bearing_deg': round(float(bearing), 1),
+                'eta_s': int(round(float(eta)))
+            }
+            for m, distance, bearing, eta in zip(members, distances, bearings, etas)
+        ]
+    }
+
+
+class MeetSuggestionCache:
+    """Per-share cache of meeting point suggestions.
+
+    Each entry remembers the member positions it was computed from, so a
+    location update only invalidates a share's suggestions when that member
+    is new to the computation or has moved more than INVALIDATE_DISTANCE_M.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = {}  # share_code -> {method: (result, {sid: (lat, lon)})}
+
+    def get(self, share_code, method):
+        with self._lock:
+            entry = self._entries.get(share_code, {}).get(method)
+        return entry[0] if entry else None
+
+    def put(self, share_code, method, result, members):
+        positions = {m['sid']: (m['lat'], m['lon']) for m in members}
+        with self._lock:
+            self._entries.setdefault(share_code, {})[method] = (result, positions)
+
+    def note_location(self, share_code, sid, lat, lon):
+        """Drops cached suggestions for a share if this update would change them noticeably."""
+        with self._lock:
+            methods = self._entries.get(share_code)
+            if not methods:
+                return
+            for method, (_result, positions) in list(methods.items()):
+                previous = positions.get(sid)
+                if previous is None or haversine_m(previous[0], previous[1], lat, lon) > INVALIDATE_DISTANCE_M:
+                    del methods[method]
+
+    def invalidate(self, share_code):
+        """Drops all cached suggestions for a share, e.g. when a member leaves."""
+        with self._lock:
+            self._entries.pop(share_code, None)
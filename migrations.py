@@ -0,0 +1,175 @@
+"""
+Versioned schema migrations for the SimpleMeet database.
+
+The schema version lives in SQLite's user_version pragma. Each migration
+upgrades the schema by exactly one version inside its own transaction, and
+init_db() applies any outstanding ones at startup.
+
+Schema history:
+
+    1  shares keyed by share_code, users keyed by Socket.IO sid holding
+       everything including the position, with indexes on users.share_code,
+       users.last_update and shares.expires_at
+    2  integer surrogate keys: shares(id), members(id); the frequently
+       rewritten position columns live in a narrow WITHOUT ROWID
+       positions table, so a location update touches a single b-tree
+"""
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class MigrationError(Exception):
+    """Raised when the database can't be brought to the expected schema version."""
+
+
+def _column_names(conn, table):
+    return {row[1] for row in conn.execute(f'PRAGMA table_info({table})')}
+
+
+def _migrate_1_initial_schema(conn):
+    """Creates the original schema, or brings databases from before expires_at up to it."""
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS shares (
+            share_code TEXT PRIMARY KEY,
+            created_at INTEGER DEFAULT (CAST(strftime('%s', 'now') AS INTEGER)),
+            expires_at INTEGER DEFAULT (CAST(strftime('%s', 'now', '+24 hours') AS INTEGER))
+        )
+    ''')
+    if 'expires_at' not in _column_names(conn, 'shares'):
+        # ALTER TABLE can't add a column with a non-constant default, so backfill it
+        conn.execute('ALTER TABLE shares ADD COLUMN expires_at INTEGER')
+        conn.execute('UPDATE shares SET expires_at = created_at + 24 * 60 * 60')
+
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS users (
+            sid TEXT PRIMARY KEY,
+            share_code TEXT NOT NULL,
+            username TEXT NOT NULL,
+            color TEXT NOT NULL,
+            lat REAL,
+            lon REAL,
+            heading REAL,
+            last_update INTEGER,
+            FOREIGN KEY(share_code) REFERENCES shares(share_code) ON DELETE CASCADE
+        )
+    ''')
+    # Older databases may hold users whose share is gone
+    conn.execute('DELETE FROM users WHERE share_code NOT IN (SELECT share_code FROM shares)')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_users_share_code ON users(share_code)')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_shares_expires ON shares(expires_at)')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_users_last_update ON users(last_update)')
+
+
+def _migrate_2_compact_schema(conn):
+    """Moves to integer keys and a narrow positions table for the hot columns.
+
+    Only indexes that queries use are kept: members are looked up by sid on
+    every event and listed by share, shares by code and by expiry during
+    cleanup. The stale member sweep scans positions every 30 minutes, which
+    doesn't justify an index that every location update would rewrite.
+    """
+    conn.execute('ALTER TABLE shares RENAME TO shares_v1')
+    conn.execute('ALTER TABLE users RENAME TO users_v1')
+    for index in ('idx_users_share_code', 'idx_shares_expires', 'idx_users_last_update'):
+        conn.execute(f'DROP INDEX IF EXISTS {index}')
+
+    conn.execute('''
+        CREATE TABLE shares (
+            id INTEGER PRIMARY KEY,
+            share_code TEXT NOT NULL UNIQUE,
+            created_at INTEGER NOT NULL DEFAULT (CAST(strftime('%s', 'now') AS INTEGER)),
+            expires_at INTEGER NOT NULL DEFAULT (CAST(strftime('%s', 'now', '+24 hours') AS INTEGER))
+        )
+    ''')
+    conn.execute('''
+        CREATE TABLE members (
+            id INTEGER PRIMARY KEY,
+            sid TEXT NOT NULL UNIQUE,
+            share_id INTEGER NOT NULL REFERENCES shares(id) ON DELETE CASCADE,
+            username TEXT NOT NULL,
+            color TEXT NOT NULL
+        )
+    ''')
+    conn.execute('''
+        CREATE TABLE positions (
+            member_id INTEGER PRIMARY KEY REFERENCES members(id) ON DELETE CASCADE,
+            lat REAL,
+            lon REAL,
+            heading REAL,
+            last_update INTEGER NOT NULL
+        ) WITHOUT ROWID
+    ''')
+    conn.execute('CREATE INDEX idx_members_share_id ON members(share_id)')
+    conn.execute('CREATE INDEX idx_shares_expires_at ON shares(expires_at)')
+
+    conn.execute('''
+        INSERT INTO shares (share_code, created_at, expires_at)
+        SELECT share_code,
+               COALESCE(created_at, CAST(strftime('%s', 'now') AS INTEGER)),
+               COALESCE(expires_at, COALESCE(created_at, CAST(strftime('%s', 'now') AS INTEGER)) + 24 * 60 * 60)
+        FROM shares_v1
+    ''')
+    # Users whose share no longer exists are dropped rather than carried over
+    conn.execute('''
+        INSERT INTO members (sid, share_id, username, color)
+        SELECT u.sid, s.id, u.username, u.color
+        FROM users_v1 u JOIN shares s ON s.share_code = u.share_code
+    ''')
+    conn.execute('''
+        INSERT INTO positions (member_id, lat, lon, heading, last_update)
+        SELECT m.id, u.lat, u.lon, u.heading, COALESCE(u.last_update, CAST(strftime('%s', 'now') AS INTEGER))
+        FROM users_v1 u JOIN members m ON m.sid = u.sid
+    ''')
+
+    conn.execute('DROP TABLE users_v1')
+    conn.execute('DROP TABLE shares_v1')
+
+
+# (version, description, upgrade function), in order
+MIGRATIONS = [
+    (1, 'initial schema', _migrate_1_initial_schema),
+    (2, 'integer keys and narrow WITHOUT ROWID positions table', _migrate_2_compact_schema),
+]
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+
+def get_schema_version(conn):
+    """Returns the schema version recorded in the database."""
+    return conn.execute('PRAGMA user_version').fetchone()[0]
+
+
+def migrate(conn, target=None):
+    """Applies outstanding migrations up to target (default: latest) and returns the versions applied."""
+    target = SCHEMA_VERSION if target is None else target
+    current = get_schema_version(conn)
+    if current > SCHEMA_VERSION:
+        raise MigrationError(f"Database schema version {current} is newer than this app supports ({SCHEMA_VERSION})")
+
+    applied = []
+    isolation_level = conn.isolation_level
+    conn.commit()
+    conn.isolation_level = None  # Manage transactions explicitly so DDL is included
+    # Table rebuilds must not trigger cascades; integrity is checked before committing instead
+    conn.execute('PRAGMA foreign_keys = OFF')
+    try:
+        for version, description, upgrade in MIGRATIONS:
+            if not current < version <= target:
+                continue
+            logger.info(f"Migrating database schema to version {version}: {description}")
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                upgrade(conn)
+                violations = conn.execute('PRAGMA foreign_key_check').fetchall()
+                if violations:
+                    raise MigrationError(f"Migration {version} left {len(violations)} foreign key violations")
+                conn.execute(f'PRAGMA user_version = {version}')
+                conn.execute('COMMIT')
+            except Exception:
+                conn.execute('ROLLBACK')
+                raise
+            applied.append(version)
+    finally:
+        conn.execute('PRAGMA foreign_keys = ON')
+        conn.isolation_level = isolation_level
+    return applied
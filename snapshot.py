@@ -0,0 +1,163 @@
+"""
+Compact binary snapshots of live share state.
+
+The server periodically (and on shutdown) dumps every share with its
+members' rejoin tokens, names, colors and last positions so that after a
+restart clients can rejoin their shares straight away.
+
+Layout (little endian):
+
+    header   magic 'SMSNAP', version u8, created_at u32, share count u32
+    share    code 7s, created_at u32, expires_at u32, member count u16
+    member   token 16s, color index u8, lat f64, lon f64, heading f32,
+             last_update u32, username length u8, username utf-8
+             (color index 0xFF is followed by a 7 byte '#RRGGBB' color)
+    trailer  crc32 u32 of everything before it
+
+Missing positions, headings and times are stored as NaN / 0, as are values
+that aren't finite numbers (or don't fit the field), so one bad row can't
+prevent the whole snapshot from being written.
+"""
+import math
+import os
+import struct
+import time
+import zlib
+
+SNAPSHOT_MAGIC = b'SMSNAP'
+SNAPSHOT_VERSION = 1
+
+_HEADER = struct.Struct('<6sBII')
+_SHARE = struct.Struct('<7sIIH')
+_MEMBER = struct.Struct('<16sBddfI')
+_CRC = struct.Struct('<I')
+_CUSTOM_COLOR = 0xFF
+TOKEN_BYTES = 16
+
+
+class SnapshotError(Exception):
+    """Raised when a snapshot file is corrupt or of an unsupported version."""
+
+
+_F32_MAX = 3.4028234663852886e38
+
+
+def _nan_if_none(value, limit=math.inf):
+    """Returns value as a float, or NaN if it is missing, not a finite number or beyond limit."""
+    if value is None or isinstance(value, bool):
+        return float('nan')
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        return float('nan')
+    return value if math.isfinite(value) and abs(value) <= limit else float('nan')
+
+
+def _none_if_nan(value):
+    return None if math.isnan(value) else value
+
+
+def encode_snapshot(shares, colors, created_at=None):
+    """Serializes shares (dicts with a 'members' list) into snapshot bytes.
+
+    colors is the palette that member colors are stored as indexes into.
+    """
+    color_index = {color: i for i, color in enumerate(colors)}
+    parts = [_HEADER.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION, int(created_at or time.time()), len(shares))]
+
+    for share in shares:
+        members = share['members']
+        parts.append(_SHARE.pack(share['share_code'].encode('ascii'), share.get('created_at') or 0,
+                                 share.get('expires_at') or 0, len(members)))
+        for member in members:
+            index = color_index.get(member['color'], _CUSTOM_COLOR)
+            parts.append(_MEMBER.pack(
+                bytes.fromhex(member['token']),
+                index,
+                _nan_if_none(member.get('lat')),
+                _nan_if_none(member.get('lon')),
+                _nan_if_none(member.get('heading'), limit=_F32_MAX),
+                member.get('last_update') or 0
+            ))
+            if index == _CUSTOM_COLOR:
+                parts.append(member['color'].encode('ascii')[:7].ljust(7))
+            username = member['username'].encode('utf-8')[:255]
+            parts.append(bytes((len(username),)) + username)
+
+    body = b''.join(parts)
+    return body + _CRC.pack(zlib.crc32(body))
+
+
+def decode_snapshot(data, colors):
+    """Parses snapshot bytes back into (created_at, shares)."""
+    if len(data) < _HEADER.size + _CRC.size:
+        raise SnapshotError("Snapshot is truncated")
+    body, (crc,) = data[:-_CRC.size], _CRC.unpack(data[-_CRC.size:])
+    if zlib.crc32(body) != crc:
+        raise SnapshotError("Snapshot checksum mismatch")
+
+    magic, version, created_at, share_count = _HEADER.unpack_from(body, 0)
+    if magic != SNAPSHOT_MAGIC:
+        raise SnapshotError("Not a SimpleMeet snapshot")
+    if version != SNAPSHOT_VERSION:
+        raise SnapshotError(f"Unsupported snapshot version {version}")
+
+    offset = _HEADER.size
+    shares = []
+    try:
+        for _ in range(share_count):
+            code, share_created, expires_at, member_count = _SHARE.unpack_from(body, offset)
+            offset += _SHARE.size
+            members = []
+            for _ in range(member_count):
+                token, index, lat, lon, heading, last_update = _MEMBER.unpack_from(body, offset)
+                offset += _MEMBER.size
+                if index == _CUSTOM_COLOR:
+                    color = body[offset:offset + 7].decode('ascii').strip()
+                    offset += 7
+                else:
+                    color = colors[index]
+                name_length = body[offset]
+                username = body[offset + 1:offset + 1 + name_length].decode('utf-8')
+                offset += 1 + name_length
+                members.append({
+                    'token': token.hex(),
+                    'username': username,
+                    'color': color,
+                    'lat': _none_if_nan(lat),
+                    'lon': _none_if_nan(lon),
+                    'heading': _none_if_nan(heading),
+                    'last_update': last_update or None
+                })
+            shares.append({
+                'share_code': code.decode('ascii'),
+                'created_at': share_created or None,
+                'expires_at': expires_at or None,
+                'members': members
+            })
+    except (struct.error, IndexError, UnicodeDecodeError) as e:
+        raise SnapshotError(f"Malformed snapshot: {e}") from e
+
+    return created_at, shares
+
+
+def write_snapshot(path, shares, colors):
+    """Atomically writes a snapshot file and returns its size in bytes."""
+    data = encode_snapshot(shares, colors)
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+    return len(data)
+
+
+def read_snapshot(path, colors):
+    """Reads a snapshot file, returning None if there is none."""
+    try:
+        with open(path, 'rb') as f:
+            data = f.read()
+    except FileNotFoundError:
+        return None
+    return decode_snapshot(data, colors)
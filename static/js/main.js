@@ -24,14 +24,30 @@ const MAX_RECONNECT_ATTEMPTS = 5;
 const RECONNECT_DELAY = 2000;
 const LOCATION_UPDATE_RATE_LIMIT = 2000; // Minimum time between location updates (ms)
 
+// Dead reckoning: other users' markers are extrapolated from their last speed and heading,
+// so we only need to send a new fix once that prediction of us is off by too much
+const DEAD_RECKONING_ERROR_THRESHOLD_M = 10; // Send a fix when the prediction drifts this far (meters)
+const DEAD_RECKONING_MAX_INTERVAL_MS = 30000; // Always send a fix at least this often
+const MAX_EXTRAPOLATION_MS = DEAD_RECKONING_MAX_INTERVAL_MS + 5000; // Stop predicting when fixes stop arriving
+const MARKER_SMOOTHING_MS = 400; // Time constant for easing markers toward their predicted position
+const EARTH_RADIUS_M = 6371000;
+
 // --- State ---
 let socket = null;
 let map = null;
 let userMarker = null;
 let otherUserMarkers = {}; // { sid: marker }
+let markerTracks = {}; // { sid: { fix, receivedAt, lat, lon } } - animated positions of other users
+let markerAnimationId = null;
+let lastAnimationFrame = 0;
+let lastSentFix = null; // The fix other users are currently extrapolating us from
+let meetingMarker = null; // Suggested meeting point, if requested
 let shareCode = null;
 let userColor = '#808080'; // Default color
 let username = null; // Store own username
+let memberToken = null; // Secret that lets us rejoin as the same member after losing the connection
+let isRejoining = false;
+let reconnectNoticeShown = false; // Only one notice per outage while Socket.IO keeps retrying
 let locationWatchId = null;
 let lastPosition = null;
 let isIntentionalDisconnect = false; // Flag for intentional disconnect
@@ -61,6 +77,7 @@ const leaveShareBtn = document.getElementById('leave-share-btn');
 const userListContainer = document.getElementById('user-list-container');
 const userListElement = document.getElementById('user-list');
 const copyShareBtn = document.getElementById('copy-share-btn'); // Get copy button
+const meetBtn = document.getElementById('meet-btn');
 
 // PWA Elements
 const installPrompt = document.getElementById('install-prompt');
@@ -73,7 +90,9 @@ function initializeMap() {
     // Set default view with max zoom (19)
     map = L.map('map').setView([51.505, -0.09], 19);
 
-    L.tileLayer('https://{s}.tile.openstreetmap.org/{z}/{x}/{y}.png', {
+    // The server tells us whether to use its shared tile cache or OSM directly
+    const tileUrl = mapDiv.dataset.tileUrl || 'https://{s}.tile.openstreetmap.org/{z}/{x}/{y}.png';
+    L.tileLayer(tileUrl, {
         maxZoom: 19,
         attribution: '&copy; <a href="http://www.openstreetmap.org/copyright">OpenStreetMap</a>'
     }).addTo(map);
@@ -95,23 +114,44 @@ function initializeMap() {
 }
 
 function connectWebSocket() {
+    if (socket) {
+        // Reuse the existing socket (and its handlers) instead of opening a second one
+        if (!socket.connected) {
+            console.log('Reconnecting existing WebSocket.');
+            socket.connect();
+        }
+        return;
+    }
     console.log(`Connecting WebSocket to ${SERVER_URL}`);
     socket = io.connect(SERVER_URL);
 
     // --- Socket Event Handlers ---
     socket.on('connect', () => {
         console.log('Connected to server with SID:', socket.id);
+        reconnectNoticeShown = false;
         // Update status ONLY if not already in a share (e.g., on initial load/reconnect)
         if (!shareCode) {
             statusElement.textContent = 'Connected. Create or join a share.';
+        } else if (memberToken) {
+            // We lost the connection (e.g. server restart) - rejoin as the same member
+            console.log(`Rejoining share ${shareCode} after reconnect.`);
+            updateStatus(`Reconnected. Rejoining share ${shareCode}...`);
+            isRejoining = true;
+            socket.emit('rejoin_share', { share_code: shareCode, token: memberToken });
         }
     });
 
     socket.on('disconnect', (reason) => {
-        console.warn('Disconnected from server.');
+        console.warn('Disconnected from server.', reason);
         if (!isIntentionalDisconnect) { // If disconnect was unexpected
-            alert('Lost connection to the server.');
-            resetUIOnDisconnect(); // Reset UI to initial state
+            if (shareCode && memberToken && reason !== 'io server disconnect') {
+                // Socket.IO reconnects automatically; keep our share so we can rejoin it
+                updateStatus('Connection lost. Reconnecting...');
+                showToast('📡 Connection lost. Reconnecting...', 'warning');
+            } else {
+                alert('Lost connection to the server.');
+                resetUIOnDisconnect(); // Reset UI to initial state
+            }
         }
         // Always reset the flag after handling disconnect
         isIntentionalDisconnect = false;
@@ -119,6 +159,16 @@ function connectWebSocket() {
 
     socket.on('connect_error', (error) => {
         console.error('Connection Error:', error);
+        if (shareCode && memberToken) {
+            // Fires on every failed reconnect attempt, e.g. while the server restarts;
+            // we rejoin automatically once it is back, so don't block with dialogs
+            updateStatus('Server unreachable. Still trying to reconnect...');
+            if (!reconnectNoticeShown) {
+                reconnectNoticeShown = true;
+                showToast('📡 Server unreachable. Reconnecting...', 'warning');
+            }
+            return;
+        }
         alert('Failed to connect to the server. Please try refreshing the page.');
     });
 
@@ -126,6 +176,7 @@ function connectWebSocket() {
         shareCode = data.share_code;
         userColor = data.color; // Store assigned color
         username = data.username; // Store assigned username
+        memberToken = data.token;
         console.log(`Share created successfully! Code: ${shareCode}`);
         shareCodeDisplay.textContent = `Share Code: ${shareCode}`;
         initialOptionsDiv.style.display = 'none';
@@ -141,6 +192,12 @@ function connectWebSocket() {
         shareCode = data.share_code;
         userColor = data.color; // Store assigned color
         username = data.username; // Store assigned username
+        memberToken = data.token;
+        if (isRejoining) {
+            isRejoining = false;
+            lastSentFix = null; // Send a fresh fix straight away
+            showToast(data.rejoined ? '🔄 Rejoined share' : '🔄 Rejoined share as a new member', 'success');
+        }
         console.log(`Joined share ${shareCode} successfully! Your color: ${userColor}`);
         shareCodeDisplay.textContent = `Share Code: ${shareCode}`;
         initialOptionsDiv.style.display = 'none';
@@ -155,6 +212,10 @@ function connectWebSocket() {
     socket.on('join_error', (data) => {
         console.error(`Error joining share: ${data.message}`);
         alert(`Error joining share: ${data.message}`);
+        if (isRejoining) {
+            isRejoining = false;
+            resetUIOnDisconnect(); // The share is gone, start over
+        }
         // Re-enable join button?
         joinShareBtn.disabled = false;
     });
@@ -162,13 +223,24 @@ function connectWebSocket() {
     socket.on('user_list_update', (data) => {
         console.log('Received user list update:', data.users);
         const users = data.users; // Access the users array from the data object
-        // Clear existing markers except potentially our own if updates started quickly
-        Object.keys(otherUserMarkers).forEach(sid => removeMarker(sid));
+        // Only drop markers of users who are gone; the rest keep their animated tracks
+        const listedSids = new Set(users.map(user => user.sid));
+        Object.keys(otherUserMarkers).forEach(sid => {
+            if (!listedSids.has(sid)) removeMarker(sid);
+        });
         updateUserList(users); // Update the list display
 
         users.forEach(user => {
             // Don't re-add self if already added by early location update
-            if (user.sid !== socket.id) {
+            if (user.sid === socket.id) return;
+            const marker = otherUserMarkers[user.sid];
+            if (marker) {
+                // The list has no speed or fix time, so resetting the track from it would
+                // snap the marker back to the last fix. Only refresh the color.
+                const track = markerTracks[user.sid];
+                const heading = track ? track.fix.heading : user.heading;
+                marker.setIcon(createColoredIcon(user.color, Number.isFinite(heading) ? heading : 0));
+            } else {
                 updateMarker(user.sid, {
                     lat: user.lat,
                     lon: user.lon,
@@ -201,6 +273,16 @@ function connectWebSocket() {
         // console.log('Received location broadcast:', data);
         updateMarker(data.sid, data); // Update marker for other users
     });
+
+    socket.on('meet_suggestion', (data) => {
+        console.log('Received meeting point suggestion:', data);
+        showMeetingPoint(data);
+    });
+
+    socket.on('meet_suggestion_error', (data) => {
+        console.warn(`Meeting point suggestion failed: ${data.message}`);
+        showToast(`🤝 ${data.message}`, 'warning');
+    });
 }
 
 // --- UI Update Functions ---
@@ -248,17 +330,13 @@ function startWatchingPosition() {
             (position) => {
                 const now = Date.now();
                 lastPosition = position;
-                const { latitude, longitude, heading, speed } = position.coords;
-                
-                // Rate limiting - don't send updates too frequently
-                if (now - lastLocationUpdate < UPDATE_INTERVAL_MS) {
-                    return;
-                }
-                lastLocationUpdate = now;
-                
-                console.log(`Location update: ${latitude}, ${longitude}, Heading: ${heading}`);
+                const { latitude, longitude } = position.coords;
+                // Browsers report NaN/null heading and speed when they are unknown
+                const heading = Number.isFinite(position.coords.heading) ? position.coords.heading : null;
+                const speed = Number.isFinite(position.coords.speed) ? position.coords.speed : null;
+                const fix = { lat: latitude, lon: longitude, heading, speed, timestamp: position.timestamp || now };
 
-                // Update our own marker immediately
+                // Update our own marker with every real fix
                 if (socket && socket.id) {
                     updateMarker(socket.id, { 
                         lat: latitude, 
@@ -268,12 +346,23 @@ function startWatchingPosition() {
                     });
                 }
 
+                // Only send when the others' prediction of us has drifted too far
+                if (!shouldSendFix(fix, now)) {
+                    return;
+                }
+                
+                console.log(`Location update: ${latitude}, ${longitude}, Heading: ${heading}, Speed: ${speed}`);
+
                 // Send update to server if connected
                 if (socket && socket.connected && shareCode) {
+                    lastLocationUpdate = now;
+                    lastSentFix = { ...fix, sentAt: now };
                     socket.emit('location_update', {
                         lat: latitude,
                         lon: longitude,
-                        heading: heading
+                        heading: heading,
+                        speed: speed,
+                        timestamp: fix.timestamp
                     });
                 } else if (!isOnline) {
                     // Store for later sync when online
@@ -317,6 +406,22 @@ function startWatchingPosition() {
     }
 }
 
+// Decides whether a new fix is needed, based on how far other users' prediction of us is off
+function shouldSendFix(fix, now) {
+    if (!lastSentFix) {
+        return true;
+    }
+    const sinceLastUpdate = now - lastLocationUpdate;
+    if (sinceLastUpdate < UPDATE_INTERVAL_MS) {
+        return false; // Never faster than the base rate
+    }
+    if (sinceLastUpdate >= DEAD_RECKONING_MAX_INTERVAL_MS) {
+        return true; // Heartbeat so others know we're still here
+    }
+    const predicted = predictPosition(lastSentFix, now - lastSentFix.sentAt);
+    return distanceMeters(predicted.lat, predicted.lon, fix.lat, fix.lon) > DEAD_RECKONING_ERROR_THRESHOLD_M;
+}
+
 function storeLocationForSync(lat, lon, heading) {
     // Store location data for background sync when online
     if ('localStorage' in window) {
@@ -337,6 +442,102 @@ function stopLocationUpdates() {
     }
 }
 
+// --- Dead Reckoning ---
+
+// Extrapolates a fix along its heading at its speed. The prediction is held once it is older
+// than MAX_EXTRAPOLATION_MS, since the sender would have reported again by then if it could.
+function predictPosition(fix, elapsedMs) {
+    if (!Number.isFinite(fix.speed) || !fix.speed || !Number.isFinite(fix.heading)) {
+        return { lat: fix.lat, lon: fix.lon };
+    }
+    const seconds = Math.min(Math.max(elapsedMs, 0), MAX_EXTRAPOLATION_MS) / 1000;
+    const distance = fix.speed * seconds;
+    const bearing = fix.heading * Math.PI / 180;
+    const dLat = distance * Math.cos(bearing) / EARTH_RADIUS_M;
+    const dLon = distance * Math.sin(bearing) / (EARTH_RADIUS_M * Math.cos(fix.lat * Math.PI / 180));
+    return {
+        lat: fix.lat + dLat * 180 / Math.PI,
+        lon: fix.lon + dLon * 180 / Math.PI
+    };
+}
+
+// Equirectangular approximation - accurate enough for the short distances compared here
+function distanceMeters(lat1, lon1, lat2, lon2) {
+    const meanLat = (lat1 + lat2) / 2 * Math.PI / 180;
+    const x = (lon2 - lon1) * Math.PI / 180 * Math.cos(meanLat);
+    const y = (lat2 - lat1) * Math.PI / 180;
+    return Math.sqrt(x * x + y * y) * EARTH_RADIUS_M;
+}
+
+// Records a new fix for another user's marker; the animation loop moves the marker toward it
+function setMarkerTrack(sid, data) {
+    const track = markerTracks[sid];
+    if (track && track.fix.timestamp && data.timestamp && data.timestamp < track.fix.timestamp) {
+        return; // Ignore fixes arriving out of order
+    }
+    markerTracks[sid] = {
+        fix: {
+            lat: data.lat,
+            lon: data.lon,
+            heading: data.heading,
+            speed: data.speed,
+            timestamp: data.timestamp
+        },
+        // Extrapolate from when we received it; sender clocks can't be trusted to match ours
+        receivedAt: Date.now(),
+        lat: track ? track.lat : data.lat,
+        lon: track ? track.lon : data.lon
+    };
+    startMarkerAnimation();
+}
+
+function startMarkerAnimation() {
+    if (markerAnimationId === null) {
+        lastAnimationFrame = Date.now();
+        markerAnimationId = requestAnimationFrame(animateMarkers);
+    }
+}
+
+function animateMarkers() {
+    const now = Date.now();
+    // Exponential smoothing that behaves the same regardless of frame rate
+    const alpha = 1 - Math.exp(-(now - lastAnimationFrame) / MARKER_SMOOTHING_MS);
+    lastAnimationFrame = now;
+    let stillMoving = false;
+
+    Object.entries(markerTracks).forEach(([sid, track]) => {
+        const marker = otherUserMarkers[sid];
+        if (!marker) {
+            delete markerTracks[sid];
+            return;
+        }
+        const elapsed = now - track.receivedAt;
+        const target = predictPosition(track.fix, elapsed);
+        if (!Number.isFinite(target.lat) || !Number.isFinite(target.lon)) {
+            return; // A bad fix must not stop the loop for everyone else's markers
+        }
+        track.lat += (target.lat - track.lat) * alpha;
+        track.lon += (target.lon - track.lon) * alpha;
+        marker.setLatLng([track.lat, track.lon]);
+
+        const extrapolating = track.fix.speed > 0 && elapsed < MAX_EXTRAPOLATION_MS;
+        if (extrapolating || distanceMeters(track.lat, track.lon, target.lat, target.lon) > 0.1) {
+            stillMoving = true;
+        }
+    });
+
+    // Stop the loop once every marker has settled; the next fix restarts it
+    markerAnimationId = stillMoving ? requestAnimationFrame(animateMarkers) : null;
+}
+
+function stopMarkerAnimation() {
+    if (markerAnimationId !== null) {
+        cancelAnimationFrame(markerAnimationId);
+        markerAnimationId = null;
+    }
+    markerTracks = {};
+}
+
 // --- Map Marker Management ---
 
 // Helper to create a custom colored + potentially rotated icon
@@ -407,7 +608,11 @@ function updateMarker(sid, data) {
 
     if (marker) {
         console.log(`Marker exists for ${sid}. Updating position and icon.`);
-        marker.setLatLng(latLng);
+        if (isCurrentUser) {
+            marker.setLatLng(latLng);
+        } else {
+            setMarkerTrack(sid, data); // Animated instead of jumping to the new fix
+        }
         // Update icon/rotation if needed
         const rotation = (heading !== null && heading !== undefined) ? heading : 0;
         marker.setIcon(createColoredIcon(color, rotation));
@@ -427,6 +632,7 @@ function updateMarker(sid, data) {
             console.log(`Added marker for CURRENT USER (${sid}) at ${latLng}`);
         } else {
             otherUserMarkers[sid] = marker;
+            setMarkerTrack(sid, data);
             console.log(`Added marker for OTHER user ${sid} at ${latLng}`);
         }
     }
@@ -439,6 +645,46 @@ function updateMarker(sid, data) {
     }
 }
 
+function formatDuration(seconds) {
+    const minutes = Math.round(seconds / 60);
+    if (minutes < 1) return 'under a minute';
+    if (minutes < 60) return `${minutes} min`;
+    return `${Math.floor(minutes / 60)} h ${minutes % 60} min`;
+}
+
+// Shows the server's suggested meeting point and our own distance/ETA to it
+function showMeetingPoint(suggestion) {
+    if (!map) return;
+    const latLng = [suggestion.lat, suggestion.lon];
+    if (meetingMarker) {
+        meetingMarker.setLatLng(latLng);
+    } else {
+        meetingMarker = L.marker(latLng).addTo(map);
+    }
+
+    const me = suggestion.members.find(member => socket && member.sid === socket.id);
+    let message = '🤝 Suggested meeting point';
+    if (me) {
+        message += `: ${Math.round(me.distance_m)} m away, about ${formatDuration(me.eta_s)}`;
+    }
+    meetingMarker.bindPopup(message).openPopup();
+    map.panTo(latLng);
+    showToast(message, 'info', 5000);
+}
+
+function clearMeetingPoint() {
+    if (meetingMarker && map) map.removeLayer(meetingMarker);
+    meetingMarker = null;
+}
+
+function requestMeetingPoint() {
+    if (socket && socket.connected && shareCode) {
+        socket.emit('meet_suggestion', { method: 'median' });
+    } else {
+        showToast('🤝 Join a share to get a meeting point', 'warning');
+    }
+}
+
 function removeMarker(sid) {
     if (!map) return;
 
@@ -446,6 +692,7 @@ function removeMarker(sid) {
     if (marker) {
         map.removeLayer(marker);
         delete otherUserMarkers[sid];
+        delete markerTracks[sid];
         console.log(`Removed marker for user ${sid}`);
     }
 }
@@ -527,11 +774,15 @@ function leaveShare() {
     });
     userMarker = null;
     otherUserMarkers = {};
+    stopMarkerAnimation();
+    clearMeetingPoint();
     const previousShareCode = shareCode;
     shareCode = null;
     userColor = '#808080';
     username = null;
+    memberToken = null;
     lastPosition = null;
+    lastSentFix = null;
     initialOptionsDiv.style.display = ''; // Remove inline display style
     sharingInfoDiv.style.display = 'none';
     mapDiv.style.display = 'none'; // Ensure map is hidden
@@ -565,12 +816,16 @@ function resetUIOnDisconnect() {
     });
     userMarker = null;
     otherUserMarkers = {};
+    stopMarkerAnimation();
+    clearMeetingPoint();
 
     // Reset state variables
     shareCode = null;
     userColor = '#808080'; // Reset to default
     username = null;
+    memberToken = null;
     lastPosition = null;
+    lastSentFix = null;
 
     // Reset UI elements
     initialOptionsDiv.style.display = 'block';
@@ -645,6 +900,7 @@ function updateUserList(users) {
 createShareBtn.addEventListener('click', createShare);
 joinShareBtn.addEventListener('click', joinShare);
 leaveShareBtn.addEventListener('click', leaveShare);
+meetBtn.addEventListener('click', requestMeetingPoint);
 
 // Add listener for the copy button
 copyShareBtn.addEventListener('click', () => {
@@ -1,4 +1,5 @@
 // SimpleMeet Service Worker - v1.0.0
+// CACHE_NAME and STATIC_CACHE_ASSETS are rewritten from the asset manifest by assets.py
 const CACHE_NAME = 'simplemeet-v1.0.0';
 const OFFLINE_URL = '/offline.html';
 
@@ -112,12 +113,20 @@ self.addEventListener('fetch', (event) => {
         return;
     }
     
-    // Handle OpenStreetMap tiles
-    if (url.hostname.includes('tile.openstreetmap.org')) {
+    // Handle OpenStreetMap tiles (direct or via the server's shared tile cache)
+    if (url.hostname.includes('tile.openstreetmap.org') || url.pathname.startsWith('/tiles/')) {
         event.respondWith(handleTileRequest(request));
         return;
     }
     
+    // Fingerprinted assets and versioned CDN files never change, so serve them cache first.
+    // Anything else from this origin (e.g. unbuilt /static/ files) keeps its URL across
+    // releases and must be revalidated.
+    if (url.origin === self.location.origin && !url.pathname.startsWith('/assets/')) {
+        event.respondWith(handleRevalidatedRequest(request));
+        return;
+    }
+    
     // Handle static assets
     event.respondWith(handleStaticRequest(request));
 });
@@ -211,7 +220,26 @@ async function handleTileRequest(request) {
     }
 }
 
-// Static asset request handler
+// Unversioned same-origin request handler (network first, cache as offline fallback)
+async function handleRevalidatedRequest(request) {
+    const cache = await caches.open(CACHE_NAME);
+    
+    try {
+        const networkResponse = await fetch(request);
+        if (networkResponse.ok) {
+            cache.put(request, networkResponse.clone());
+        }
+        
+        return networkResponse;
+    } catch (error) {
+        console.log('Network failed for static request, trying cache...');
+        
+        const cachedResponse = await cache.match(request);
+        return cachedResponse || new Response('', { status: 404 });
+    }
+}
+
+// Static asset request handler (cache first, for URLs whose content never changes)
 async function handleStaticRequest(request) {
     const cache = await caches.open(CACHE_NAME);
     
@@ -0,0 +1,32 @@
+"""
+Shared fixtures for tests that drive the app through the Socket.IO test client.
+"""
+import pytest
+import sys
+import os
+
+# Add the parent directory to the path so we can import the app
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app as app_module
+from meeting import MeetSuggestionCache
+
+
+@pytest.fixture
+def fresh_app(tmp_path, monkeypatch):
+    """Points the app at a temporary database and snapshot with empty live state and no rate limit."""
+    monkeypatch.setattr(app_module, 'DB_PATH', str(tmp_path / 'locations.db'))
+    monkeypatch.setattr(app_module, 'SNAPSHOT_PATH', str(tmp_path / 'live_state.snap'))
+    monkeypatch.setattr(app_module, 'member_tokens', {})
+    monkeypatch.setattr(app_module, 'pending_rejoins', {})
+    monkeypatch.setattr(app_module, 'recent_speeds', {})
+    monkeypatch.setattr(app_module, 'meet_suggestions', MeetSuggestionCache())
+    monkeypatch.setattr(app_module, 'location_update_timestamps', {})
+    monkeypatch.setattr(app_module, 'LOCATION_UPDATE_RATE_LIMIT', 0)
+    app_module.init_db()
+    return app_module
+
+
+def received(client, name):
+    """Returns the payloads of the events with the given name the client has received."""
+    return [event['args'][0] for event in client.get_received() if event['name'] == name]
@@ -8,7 +8,7 @@ import os
 # Add the parent directory to the path so we can import the app
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from app import app, init_db, validate_share_code, validate_username, sanitize_coordinates
+from app import app, init_db, validate_share_code, validate_username, sanitize_coordinates, sanitize_heading, sanitize_motion
 
 @pytest.fixture
 def client():
@@ -90,5 +90,38 @@ def test_sanitize_coordinates():
     assert lat is None
     assert lon is None
 
+def test_sanitize_motion():
+    """Test speed and fix timestamp sanitization for dead reckoning."""
+    # Valid motion data
+    assert sanitize_motion(1.5, 1700000000000) == (1.5, 1700000000000)
+    assert sanitize_motion('2', 1700000000000.7) == (2.0, 1700000000000)
+    assert sanitize_motion(0, None) == (0.0, None)
+    
+    # Missing or invalid values are dropped independently
+    assert sanitize_motion(None, None) == (None, None)
+    assert sanitize_motion(-1, 1700000000000) == (None, 1700000000000)
+    assert sanitize_motion(500, 'now') == (None, None)
+    assert sanitize_motion(float('nan'), True) == (None, None)
+    assert sanitize_motion(3, -5) == (3.0, None)
+    assert sanitize_motion(3, float('nan')) == (3.0, None)
+    assert sanitize_motion(3, float('inf')) == (3.0, None)
+    assert sanitize_motion(3, float('-inf')) == (3.0, None)
+    assert sanitize_motion(3, 1e20) == (3.0, None)  # Far in the future
+
+def test_sanitize_heading():
+    """Test heading sanitization."""
+    assert sanitize_heading(90) == 90.0
+    assert sanitize_heading('359.5') == 359.5
+    assert sanitize_heading(0) == 0.0
+    
+    assert sanitize_heading(None) is None
+    assert sanitize_heading('north') is None
+    assert sanitize_heading(True) is None
+    assert sanitize_heading(-1) is None
+    assert sanitize_heading(361) is None
+    assert sanitize_heading(1e39) is None
+    assert sanitize_heading(float('nan')) is None
+    assert sanitize_heading(float('inf')) is None
+
 if __name__ == '__main__':
     pytest.main([__file__]) 
\ No newline at end of file
@@ -0,0 +1,104 @@
+"""
+Tests for the static asset pipeline and its serving routes.
+"""
+import pytest
+import sys
+import os
+import gzip
+
+# Add the parent directory to the path so we can import the app
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app as app_module
+from assets import build, load_manifest, render_service_worker, fingerprint
+
+STATIC_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'static')
+
+
+@pytest.fixture
+def built(tmp_path, monkeypatch):
+    """Builds the real static assets into a temporary dist dir used by the app."""
+    out_dir = str(tmp_path / 'dist')
+    manifest = build(STATIC_DIR, out_dir)
+    monkeypatch.setattr(app_module, 'ASSET_DIST_DIR', out_dir)
+    monkeypatch.setattr(app_module, 'asset_manifest', manifest)
+    return out_dir, manifest
+
+
+def test_build_writes_fingerprinted_compressed_files(built):
+    """Test that each asset is hashed, minified and precompressed."""
+    out_dir, manifest = built
+    assert load_manifest(out_dir) == manifest
+
+    entry = manifest['assets']['js/main.js']
+    assert entry['file'].startswith('js/main.') and entry['file'].endswith('.js')
+    with open(os.path.join(out_dir, entry['file']), 'rb') as f:
+        data = f.read()
+    assert fingerprint('js/main.js', data) == entry['file']
+    assert len(data) < os.path.getsize(os.path.join(STATIC_DIR, 'js', 'main.js'))
+
+    with open(os.path.join(out_dir, entry['file'] + '.gz'), 'rb') as f:
+        assert gzip.decompress(f.read()) == data
+
+
+def test_load_manifest_missing(tmp_path):
+    """Test that an unbuilt dist dir yields an empty manifest."""
+    assert load_manifest(str(tmp_path)) == {'assets': {}}
+
+
+def test_render_service_worker():
+    """Test that the precache list and cache name come from the manifest."""
+    manifest = {'version': 'abc123', 'assets': {'js/main.js': {'file': 'js/main.1234.js'}}}
+    source = (
+        "const CACHE_NAME = 'simplemeet-v1.0.0';\n"
+        "const STATIC_CACHE_ASSETS = [\n"
+        "    '/',\n"
+        "    '/static/js/main.js',\n"
+        "    '/static/manifest.json',\n"
+        "];\n"
+    )
+    rendered = render_service_worker(source, manifest)
+    assert "const CACHE_NAME = 'simplemeet-abc123';" in rendered
+    assert '"/assets/js/main.1234.js"' in rendered
+    assert '"/static/manifest.json"' in rendered
+    assert '/static/js/main.js' not in rendered
+
+
+def test_serve_asset_negotiates_encoding(built):
+    """Test that the best accepted precompressed variant is served with immutable caching."""
+    _out_dir, manifest = built
+    url = '/assets/' + manifest['assets']['css/style.css']['file']
+    client = app_module.app.test_client()
+
+    response = client.get(url, headers={'Accept-Encoding': 'gzip'})
+    assert response.status_code == 200
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert response.mimetype == 'text/css'
+    assert 'immutable' in response.headers['Cache-Control']
+    assert 'Accept-Encoding' in response.headers['Vary']
+    gzipped = response.data
+
+    response = client.get(url, headers={'Accept-Encoding': 'gzip, br'})
+    assert response.headers['Content-Encoding'] == 'br'
+
+    response = client.get(url)
+    assert 'Content-Encoding' not in response.headers
+    assert gzip.decompress(gzipped) == response.data
+
+    assert client.get('/assets/css/style.css').status_code == 404
+
+
+def test_service_worker_route(built):
+    """Test that the service worker is served from the root and always revalidated."""
+    _out_dir, manifest = built
+    response = app_module.app.test_client().get('/sw.js')
+    assert response.status_code == 200
+    assert 'no-cache' in response.headers['Cache-Control']
+    assert f"simplemeet-{manifest['version']}".encode() in response.data
+
+
+def test_asset_url_falls_back_to_static(monkeypatch):
+    """Test that templates link the raw files when assets haven't been built."""
+    monkeypatch.setattr(app_module, 'asset_manifest', {'assets': {}})
+    with app_module.app.test_request_context():
+        assert app_module.asset_url('js/main.js') == '/static/js/main.js'
@@ -0,0 +1,177 @@
+"""
+Tests for meeting point computation and its per-share cache.
+"""
+import pytest
+import sys
+import os
+
+import numpy as np
+
+# Add the parent directory to the path so we can import the app
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from conftest import received
+from meeting import (MeetSuggestionCache, compute_meet_suggestion, geometric_median, centroid,
+                     haversine_m, initial_bearing_deg, smooth_speed, WALKING_SPEED_MPS)
+
+
+def member(sid, lat, lon, speed=None):
+    return {'sid': sid, 'username': f'User-{sid}', 'lat': lat, 'lon': lon, 'speed': speed}
+
+
+def test_haversine_and_bearing():
+    """Test distances and bearings against known values."""
+    # London to Paris is roughly 343.5 km
+    distance = haversine_m(np.array([51.5074]), np.array([-0.1278]), 48.8566, 2.3522)
+    assert distance[0] == pytest.approx(343_500, rel=0.005)
+
+    bearings = initial_bearing_deg(np.array([0.0, 0.0, 1.0]), np.array([0.0, 1.0, 0.0]), 0.0, 0.0)
+    assert bearings[0] == pytest.approx(0.0) or bearings[0] == pytest.approx(360.0)
+    assert bearings[1] == pytest.approx(270.0)
+    assert bearings[2] == pytest.approx(180.0)
+
+
+def test_centroid_across_antimeridian():
+    """Test that longitudes are averaged correctly across +-180."""
+    lat, lon = centroid(np.array([0.0, 0.0]), np.array([179.0, -179.0]))
+    assert lat == pytest.approx(0.0)
+    assert abs(lon) == pytest.approx(180.0)
+
+
+def test_geometric_median_across_antimeridian():
+    """Test that the median of members on both sides of +-180 stays between them."""
+    suggestion = compute_meet_suggestion([member('a', 0.0, 179.9), member('b', 0.0, -179.9)], 'median')
+    assert -180 <= suggestion['lon'] < 180
+    assert abs(suggestion['lon']) > 179.8
+    for m in suggestion['members']:
+        assert m['distance_m'] == pytest.approx(11_120, rel=0.01)
+
+
+def test_geometric_median_resists_outliers():
+    """Test that the median stays with the group when one member is far away."""
+    lats = np.array([52.5200, 52.5201, 52.5199, 52.5200, 52.6000])
+    lons = np.array([13.4050, 13.4051, 13.4049, 13.4049, 13.4050])
+
+    median_lat, median_lon = geometric_median(lats, lons)
+    mean_lat, _ = centroid(lats, lons)
+    assert haversine_m(np.array([median_lat]), np.array([median_lon]), 52.5200, 13.4050)[0] < 15
+    assert mean_lat > 52.53
+
+
+def test_compute_meet_suggestion():
+    """Test per-member distance, bearing and ETA in a suggestion."""
+    members = [member('a', 0.0, -0.01, speed=5.0), member('b', 0.0, 0.01)]
+    suggestion = compute_meet_suggestion(members, 'centroid')
+
+    assert suggestion['lat'] == pytest.approx(0.0)
+    assert suggestion['lon'] == pytest.approx(0.0)
+    a, b = suggestion['members']
+    assert a['distance_m'] == pytest.approx(1112, rel=0.01)
+    assert a['bearing_deg'] == pytest.approx(90.0)
+    assert b['bearing_deg'] == pytest.approx(270.0)
+    assert a['eta_s'] == round(a['distance_m'] / 5.0)
+    assert b['eta_s'] == round(b['distance_m'] / WALKING_SPEED_MPS)
+
+    with pytest.raises(ValueError):
+        compute_meet_suggestion(members, 'midpoint')
+    with pytest.raises(ValueError):
+        compute_meet_suggestion([], 'median')
+
+
+def test_smooth_speed():
+    """Test the recent speed average."""
+    assert smooth_speed(None, None) is None
+    assert smooth_speed(None, 4.0) == 4.0
+    assert smooth_speed(4.0, None) == 4.0
+    assert 4.0 < smooth_speed(4.0, 10.0) < 10.0
+
+
+def test_cache_invalidation():
+    """Test that only meaningful moves or new members invalidate a share's suggestion."""
+    cache = MeetSuggestionCache()
+    members = [member('a', 52.52, 13.405), member('b', 52.53, 13.41)]
+    cache.put('ABC-123', 'median', {'lat': 1}, members)
+
+    cache.note_location('ABC-123', 'a', 52.52001, 13.405)  # ~1 m
+    cache.note_location('XYZ-999', 'a', 0.0, 0.0)  # Other share
+    assert cache.get('ABC-123', 'median') == {'lat': 1}
+
+    cache.note_location('ABC-123', 'a', 52.521, 13.405)  # ~110 m
+    assert cache.get('ABC-123', 'median') is None
+
+    cache.put('ABC-123', 'median', {'lat': 2}, members)
+    cache.note_location('ABC-123', 'c', 52.52, 13.405)  # New member
+    assert cache.get('ABC-123', 'median') is None
+
+    cache.put('ABC-123', 'centroid', {'lat': 3}, members)
+    cache.invalidate('ABC-123')
+    assert cache.get('ABC-123', 'centroid') is None
+
+
+
+def join_pair(fresh_app):
+    """Creates a share with two connected members and returns (owner, guest, share_code)."""
+    owner = fresh_app.socketio.test_client(fresh_app.app)
+    owner.emit('create_share')
+    share_code = received(owner, 'share_created')[0]['share_code']
+    guest = fresh_app.socketio.test_client(fresh_app.app)
+    guest.emit('join_share', {'share_code': share_code})
+    assert received(guest, 'joined_share')
+    return owner, guest, share_code
+
+
+def test_meet_suggestion_event(fresh_app):
+    """Test the event from too few located members through a cached suggestion."""
+    owner, guest, share_code = join_pair(fresh_app)
+    owner.emit('location_update', {'lat': 52.52, 'lon': 13.40, 'heading': 0, 'speed': 1.5})
+
+    owner.emit('meet_suggestion')
+    assert received(owner, 'meet_suggestion_error')[0]['message'].startswith('At least two')
+
+    guest.emit('location_update', {'lat': 52.53, 'lon': 13.41, 'heading': 'north'})
+    owner.emit('meet_suggestion', {'method': 'centroid'})
+    suggestion = received(owner, 'meet_suggestion')[0]
+    assert suggestion['share_code'] == share_code
+    assert suggestion['lat'] == pytest.approx(52.525, abs=1e-4)
+    assert len(suggestion['members']) == 2
+    cached = fresh_app.meet_suggestions.get(share_code, 'centroid')
+    assert cached is not None
+
+    # A move of about a metre keeps the cached suggestion, a longer one drops it
+    guest.emit('location_update', {'lat': 52.53001, 'lon': 13.41})
+    assert fresh_app.meet_suggestions.get(share_code, 'centroid') is cached
+    guest.emit('meet_suggestion', {'method': 'centroid'})
+    assert received(guest, 'meet_suggestion')[0]['lat'] == suggestion['lat']
+
+    guest.emit('location_update', {'lat': 52.54, 'lon': 13.41})
+    assert fresh_app.meet_suggestions.get(share_code, 'centroid') is None
+
+
+def test_meet_suggestion_errors(fresh_app):
+    """Test that bad requests and callers outside a share get an error event."""
+    loner = fresh_app.socketio.test_client(fresh_app.app)
+    loner.emit('meet_suggestion')
+    assert received(loner, 'meet_suggestion_error')[0]['message'] == 'You are not in a share.'
+
+    owner, _guest, _share_code = join_pair(fresh_app)
+    owner.get_received()
+    for payload in (['median'], 'median', {'method': 'midpoint'}, {'method': ['median']}):
+        owner.emit('meet_suggestion', payload)
+        assert len(received(owner, 'meet_suggestion_error')) == 1
+
+
+def test_stale_cleanup_invalidates_suggestions(fresh_app):
+    """Test that removing stale members also drops cached suggestions that include them."""
+    owner, guest, share_code = join_pair(fresh_app)
+    owner.emit('location_update', {'lat': 52.52, 'lon': 13.40})
+    guest.emit('location_update', {'lat': 52.53, 'lon': 13.41})
+    owner.emit('meet_suggestion')
+    assert received(owner, 'meet_suggestion')
+
+    with fresh_app.app.app_context():
+        db = fresh_app.get_db()
+        db.execute('UPDATE positions SET last_update = 0')
+        db.commit()
+    fresh_app.cleanup_expired_shares()
+
+    assert fresh_app.meet_suggestions.get(share_code, 'median') is None
@@ -0,0 +1,89 @@
+"""
+Tests for versioned schema migrations.
+"""
+import pytest
+import sys
+import os
+import sqlite3
+
+# Add the parent directory to the path so we can import the app
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from migrations import MigrationError, SCHEMA_VERSION, get_schema_version, migrate
+from benchmarks.bench_location_update import measure
+
+
+@pytest.fixture
+def conn(tmp_path):
+    conn = sqlite3.connect(str(tmp_path / 'locations.db'))
+    conn.execute('PRAGMA foreign_keys = ON')
+    yield conn
+    conn.close()
+
+
+def index_names(conn):
+    return {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index' AND sql IS NOT NULL")}
+
+
+def test_fresh_database_migrates_to_latest(conn):
+    """Test that an empty database ends up at the latest schema."""
+    assert migrate(conn) == list(range(1, SCHEMA_VERSION + 1))
+    assert get_schema_version(conn) == SCHEMA_VERSION
+    assert migrate(conn) == []  # Nothing left to do
+
+    tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    assert {'shares', 'members', 'positions'} <= tables
+    assert 'users' not in tables
+    assert index_names(conn) == {'idx_members_share_id', 'idx_shares_expires_at'}
+
+    positions_sql = conn.execute("SELECT sql FROM sqlite_master WHERE name = 'positions'").fetchone()[0]
+    assert 'WITHOUT ROWID' in positions_sql
+
+
+def test_legacy_database_keeps_its_data(conn):
+    """Test upgrading a database from before versioning, including the missing expires_at column."""
+    conn.executescript('''
+        CREATE TABLE shares (share_code TEXT PRIMARY KEY, created_at INTEGER);
+        CREATE TABLE users (
+            sid TEXT PRIMARY KEY, share_code TEXT NOT NULL, username TEXT NOT NULL, color TEXT NOT NULL,
+            lat REAL, lon REAL, heading REAL, last_update INTEGER,
+            FOREIGN KEY(share_code) REFERENCES shares(share_code) ON DELETE CASCADE
+        );
+        INSERT INTO shares VALUES ('ABC-123', 1700000000);
+        INSERT INTO users VALUES ('sid-a', 'ABC-123', 'Alice', '#E6194B', 52.5, 13.4, 90, 1700000100);
+        INSERT INTO users VALUES ('sid-b', 'ABC-123', 'Bob', '#3CB44B', NULL, NULL, NULL, 1700000200);
+    ''')
+    conn.execute('PRAGMA foreign_keys = OFF')
+    conn.execute("INSERT INTO users VALUES ('sid-c', 'GON-000', 'Orphan', '#4363D8', 1, 2, 3, 1700000300)")
+    conn.commit()
+
+    migrate(conn)
+
+    share = conn.execute('SELECT id, share_code, created_at, expires_at FROM shares').fetchall()
+    assert share == [(1, 'ABC-123', 1700000000, 1700000000 + 24 * 60 * 60)]
+    rows = conn.execute('''
+        SELECT m.sid, m.username, m.color, p.lat, p.lon, p.heading, p.last_update
+        FROM members m JOIN positions p ON p.member_id = m.id ORDER BY m.sid
+    ''').fetchall()
+    assert rows == [
+        ('sid-a', 'Alice', '#E6194B', 52.5, 13.4, 90.0, 1700000100),
+        ('sid-b', 'Bob', '#3CB44B', None, None, None, 1700000200),
+    ]
+
+    conn.execute('PRAGMA foreign_keys = ON')
+    conn.execute('DELETE FROM shares')
+    assert conn.execute('SELECT COUNT(*) FROM positions').fetchone()[0] == 0  # Cascades through members
+
+
+def test_newer_database_is_rejected(conn):
+    """Test that a database from a newer release is not touched."""
+    conn.execute(f'PRAGMA user_version = {SCHEMA_VERSION + 1}')
+    with pytest.raises(MigrationError):
+        migrate(conn)
+
+
+def test_location_update_write_amplification():
+    """Test that the current schema writes fewer pages per location update than the original."""
+    original = measure(1, members=200, updates=200)
+    current = measure(SCHEMA_VERSION, members=200, updates=200)
+    assert current['pages_per_update'] < original['pages_per_update']
@@ -0,0 +1,139 @@
+"""
+Tests for live state snapshots and rejoining after a restart.
+"""
+import pytest
+import sys
+import os
+
+# Add the parent directory to the path so we can import the app
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from conftest import received
+from snapshot import SnapshotError, decode_snapshot, encode_snapshot, read_snapshot, write_snapshot
+
+COLORS = ['#E6194B', '#3CB44B']
+
+
+def make_shares():
+    return [
+        {
+            'share_code': 'ABC-123',
+            'created_at': 1700000000,
+            'expires_at': 1700086400,
+            'members': [
+                {'token': 'ab' * 16, 'username': 'Alice', 'color': '#3CB44B',
+                 'lat': 52.52, 'lon': 13.405, 'heading': 90.0, 'last_update': 1700000100},
+                {'token': 'cd' * 16, 'username': 'Bjørn', 'color': '#123456',
+                 'lat': None, 'lon': None, 'heading': None, 'last_update': 1700000200},
+            ]
+        },
+        {'share_code': 'XYZ-999', 'created_at': 1700000000, 'expires_at': None, 'members': []},
+    ]
+
+
+def test_snapshot_round_trip():
+    """Test that shares and members survive encoding, including nulls and custom colors."""
+    data = encode_snapshot(make_shares(), COLORS, created_at=1700000300)
+    created_at, shares = decode_snapshot(data, COLORS)
+
+    assert created_at == 1700000300
+    assert shares == make_shares()
+
+
+def test_snapshot_is_compact():
+    """Test that a member costs a few dozen bytes."""
+    shares = make_shares()
+    shares[0]['members'] = shares[0]['members'][:1] * 100
+    assert len(encode_snapshot(shares, COLORS)) < 100 * 50
+
+
+def test_unstorable_values_become_unknown():
+    """Test that values that aren't finite numbers are written as missing instead of failing."""
+    shares = make_shares()
+    alice = shares[0]['members'][0]
+    for heading in ('north', 1e39, float('inf'), True):
+        alice['heading'] = heading
+        _created_at, decoded = decode_snapshot(encode_snapshot(shares, COLORS), COLORS)
+        assert decoded[0]['members'][0]['heading'] is None
+        assert decoded[0]['members'][0]['lat'] == 52.52
+
+
+def test_corrupt_snapshot_is_rejected():
+    """Test that damaged or foreign files raise SnapshotError."""
+    data = bytearray(encode_snapshot(make_shares(), COLORS))
+    data[20] ^= 0xFF
+    with pytest.raises(SnapshotError):
+        decode_snapshot(bytes(data), COLORS)
+    with pytest.raises(SnapshotError):
+        decode_snapshot(b'junk', COLORS)
+
+
+def test_read_write_snapshot(tmp_path):
+    """Test writing and reading a snapshot file."""
+    path = str(tmp_path / 'live_state.snap')
+    assert read_snapshot(path, COLORS) is None
+
+    size = write_snapshot(path, make_shares(), COLORS)
+    assert os.path.getsize(path) == size
+    assert read_snapshot(path, COLORS)[1] == make_shares()
+
+
+
+def test_rejoin_after_restart(fresh_app):
+    """Test that a member keeps their share, color and position across a restart."""
+    client = fresh_app.socketio.test_client(fresh_app.app)
+    client.emit('create_share')
+    created = received(client, 'share_created')[0]
+    client.emit('location_update', {'lat': 52.52, 'lon': 13.405, 'heading': 45})
+
+    fresh_app.save_snapshot()
+    client.disconnect()
+
+    # Simulate a restart: in-memory state is gone, stale rows are left behind
+    fresh_app.member_tokens.clear()
+    fresh_app.restore_snapshot()
+    assert created['token'] in fresh_app.pending_rejoins
+
+    reconnected = fresh_app.socketio.test_client(fresh_app.app)
+    reconnected.emit('rejoin_share', {'share_code': created['share_code'], 'token': created['token']})
+    joined = received(reconnected, 'joined_share')[0]
+
+    assert joined['rejoined'] is True
+    assert joined['share_code'] == created['share_code']
+    assert joined['color'] == created['color']
+    assert joined['username'] == created['username']
+    assert not fresh_app.pending_rejoins
+
+    with fresh_app.app.app_context():
+        users = fresh_app._get_users_in_share(created['share_code'])
+    assert [(u['lat'], u['lon'], u['heading']) for u in users] == [(52.52, 13.405, 45)]
+
+
+def test_save_snapshot_never_raises(fresh_app, monkeypatch):
+    """Test that any failure while saving is logged rather than ending the snapshot thread."""
+    def broken(*args):
+        raise ValueError('bad row')
+    monkeypatch.setattr(fresh_app, 'write_snapshot', broken)
+    fresh_app.save_snapshot()
+    assert not os.path.exists(fresh_app.SNAPSHOT_PATH)
+
+
+def test_rejoin_with_unknown_token_joins_as_new_member(fresh_app):
+    """Test that an unknown token falls back to a normal join."""
+    owner = fresh_app.socketio.test_client(fresh_app.app)
+    owner.emit('create_share')
+    share_code = received(owner, 'share_created')[0]['share_code']
+
+    client = fresh_app.socketio.test_client(fresh_app.app)
+    client.emit('rejoin_share', {'share_code': share_code, 'token': 'ff' * 16})
+    joined = received(client, 'joined_share')[0]
+    assert joined['share_code'] == share_code
+    assert 'rejoined' not in joined
+
+
+def test_rejoin_with_invalid_payload(fresh_app):
+    """Test that a payload that isn't a dict gets a join error."""
+    client = fresh_app.socketio.test_client(fresh_app.app)
+    for payload in (None, 'ABC-123', ['ABC-123', 'ff' * 16]):
+        client.emit('rejoin_share', payload)
+        assert received(client, 'join_error') == [{'message': 'Invalid request.'}]
@@ -0,0 +1,223 @@
+"""
+Tests for the shared tile cache, run against a local stand-in tile server.
+"""
+import pytest
+import sys
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Add the parent directory to the path so we can import the app
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app as app_module
+from tile_cache import TileCache, TileFetchError, is_valid_tile, lonlat_to_tile, tiles_in_bbox
+
+TILE_SIZE = 100
+
+
+class StandInTileServer:
+    """Serves fake tiles of TILE_SIZE bytes and counts requests per path."""
+
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.requests = []
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                server.requests.append(self.path)
+                time.sleep(server.delay)
+                if self.path.startswith('/missing/'):
+                    self.send_response(404)
+                    self.end_headers()
+                    return
+                body = self.path.encode().ljust(TILE_SIZE, b'.')
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/html' if self.path.startswith('/html/') else 'image/png')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.url = f'http://127.0.0.1:{self.httpd.server_address[1]}/{{z}}/{{x}}/{{y}}.png'
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+@pytest.fixture
+def upstream():
+    server = StandInTileServer()
+    yield server
+    server.close()
+
+
+@pytest.fixture
+def cache(tmp_path, upstream):
+    return TileCache(str(tmp_path / 'tiles'), 10 * TILE_SIZE, upstream.url)
+
+
+def test_miss_then_hit(cache, upstream):
+    """Test that a tile is fetched upstream once and then served from disk."""
+    data, etag = cache.get(3, 1, 2)
+    assert data.startswith(b'/3/1/2.png')
+    assert os.path.exists(os.path.join(cache.cache_dir, '3', '1', '2.png'))
+
+    assert cache.get(3, 1, 2) == (data, etag)
+    assert upstream.requests == ['/3/1/2.png']
+
+
+def test_lru_eviction(cache, upstream):
+    """Test that the least recently used tiles are evicted once over budget."""
+    for y in range(10):
+        cache.get(5, 0, y)
+    cache.get(5, 0, 0)  # Touch the oldest tile so it survives
+    cache.get(5, 1, 0)
+    cache.get(5, 1, 1)
+
+    assert cache.total_bytes == 10 * TILE_SIZE
+    assert (5, 0, 0) in cache
+    assert (5, 0, 1) not in cache
+    assert (5, 0, 2) not in cache
+    assert not os.path.exists(os.path.join(cache.cache_dir, '5', '0', '1.png'))
+
+
+def test_index_survives_restart(cache, upstream):
+    """Test that a new cache instance picks up tiles already on disk."""
+    data, etag = cache.get(4, 2, 2)
+
+    reopened = TileCache(cache.cache_dir, cache.max_bytes, upstream.url)
+    assert reopened.get(4, 2, 2) == (data, etag)
+    assert len(upstream.requests) == 1
+
+
+def test_tiles_from_another_instance_are_adopted(cache, upstream):
+    """Test that tiles prewarmed by a separate process sharing the directory are served without refetching."""
+    cache.get(4, 0, 0)
+    prewarmer = TileCache(cache.cache_dir, cache.max_bytes, upstream.url)
+    fetched, _skipped, _failed = prewarmer.prewarm(-180, 80, -170, 85, [4, 5])
+    assert fetched > 0
+    requests_after_prewarm = len(upstream.requests)
+
+    for key in list(prewarmer._entries):
+        cache.get(*key)
+    assert len(upstream.requests) == requests_after_prewarm
+    # Adopted tiles count towards the size budget
+    assert cache.total_bytes == len(cache) * TILE_SIZE <= cache.max_bytes
+
+
+def test_concurrent_misses_are_coalesced(tmp_path):
+    """Test that simultaneous requests for one tile hit upstream only once."""
+    server = StandInTileServer(delay=0.2)
+    try:
+        cache = TileCache(str(tmp_path / 'tiles'), 10 * TILE_SIZE, server.url)
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(cache.get(6, 3, 3))) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert len(results) == 8
+        assert len(set(results)) == 1
+        assert server.requests == ['/6/3/3.png']
+    finally:
+        server.close()
+
+
+def test_upstream_error(tmp_path, upstream):
+    """Test that upstream failures raise TileFetchError and are not cached."""
+    base = upstream.url.rsplit('/{z}', 1)[0]
+    cache = TileCache(str(tmp_path / 'tiles'), 10 * TILE_SIZE, base + '/missing/{z}/{x}/{y}.png')
+    with pytest.raises(TileFetchError):
+        cache.get(1, 0, 0)
+    assert len(cache) == 0
+
+
+def test_non_image_response_is_not_cached(tmp_path, upstream):
+    """Test that an HTML page returned with status 200 is not stored as a tile."""
+    base = upstream.url.rsplit('/{z}', 1)[0]
+    cache = TileCache(str(tmp_path / 'tiles'), 10 * TILE_SIZE, base + '/html/{z}/{x}/{y}.png')
+    with pytest.raises(TileFetchError):
+        cache.get(1, 0, 0)
+    assert len(cache) == 0
+
+
+def test_store_error_still_serves_the_tile(tmp_path, monkeypatch):
+    """Test that a failure writing the tile to disk still serves it to every waiting request."""
+    server = StandInTileServer(delay=0.2)
+    try:
+        cache = TileCache(str(tmp_path / 'tiles'), 10 * TILE_SIZE, server.url)
+
+        def disk_full(*args):
+            raise OSError(28, 'No space left on device')
+        monkeypatch.setattr(cache, '_store', disk_full)
+
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(cache.get(6, 3, 3))) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert len(results) == 4
+        assert len(set(results)) == 1
+        assert results[0][0].startswith(b'/6/3/3.png')
+        assert server.requests == ['/6/3/3.png']
+        assert len(cache) == 0
+    finally:
+        server.close()
+
+
+def test_tile_math():
+    """Test tile coordinate helpers."""
+    assert is_valid_tile(0, 0, 0)
+    assert not is_valid_tile(2, 4, 0)
+    assert not is_valid_tile(20, 0, 0)
+    assert lonlat_to_tile(0.0, 0.0, 1) == (1, 1)
+    assert lonlat_to_tile(-180.0, 85.0, 3) == (0, 0)
+
+    tiles = list(tiles_in_bbox(-0.2, 51.4, 0.0, 51.6, [10, 11]))
+    assert len(tiles) == len(set(tiles))
+    assert {z for z, _, _ in tiles} == {10, 11}
+
+
+def test_prewarm(cache, upstream):
+    """Test that pre-warming fetches each missing tile in the box exactly once."""
+    expected = list(tiles_in_bbox(-0.2, 51.4, 0.0, 51.6, [9, 10]))
+    fetched, skipped, failed = cache.prewarm(-0.2, 51.4, 0.0, 51.6, [9, 10])
+    assert (fetched, skipped, failed) == (len(expected), 0, 0)
+
+    fetched, skipped, failed = cache.prewarm(-0.2, 51.4, 0.0, 51.6, [9, 10])
+    assert (fetched, skipped, failed) == (0, len(expected), 0)
+    assert len(upstream.requests) == len(expected)
+
+    with pytest.raises(ValueError):
+        cache.prewarm(-0.2, 51.4, 0.0, 51.6, [9, 10], max_tiles=1)
+
+
+def test_tile_route(cache, upstream, monkeypatch):
+    """Test the /tiles route including conditional requests."""
+    client = app_module.app.test_client()
+    assert client.get('/tiles/1/0/0.png').status_code == 404  # Cache disabled
+
+    monkeypatch.setattr(app_module, 'tile_cache', cache)
+    response = client.get('/tiles/1/0/0.png')
+    assert response.status_code == 200
+    assert response.mimetype == 'image/png'
+    assert 'public' in response.headers['Cache-Control']
+    etag = response.headers['ETag']
+
+    response = client.get('/tiles/1/0/0.png', headers={'If-None-Match': etag})
+    assert response.status_code == 304
+    assert len(upstream.requests) == 1
+
+    assert client.get('/tiles/1/5/0.png').status_code == 404  # Outside the grid
@@ -0,0 +1,345 @@
+#!/usr/bin/env python3
+"""
+Shared on-disk cache for OpenStreetMap tiles.
+
+Everyone at an event looks at roughly the same tiles, so instead of every
+browser fetching them from the OSM servers the app can serve them from
+/tiles/<z>/<x>/<y>.png out of a size-bounded LRU cache on disk. Concurrent
+misses for the same tile are coalesced into a single upstream request.
+
+Can also be run as a script to pre-warm the cache for an area:
+
+    python tile_cache.py prewarm --bbox 13.30,52.48,13.45,52.55 --zooms 12-17
+"""
+import argparse
+import hashlib
+import logging
+import math
+import os
+import threading
+import urllib.error
+import urllib.request
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_UPSTREAM_URL = 'https://tile.openstreetmap.org/{z}/{x}/{y}.png'
+# The OSM tile usage policy requires an identifying User-Agent
+USER_AGENT = 'SimpleMeet-TileCache/1.0 (+https://github.com/yfffy/simplemeet)'
+MAX_ZOOM = 19
+
+
+class TileFetchError(Exception):
+    """Raised when a tile could not be fetched from the upstream server."""
+
+
+def tile_etag(data):
+    """Returns a strong ETag (unquoted) for the given tile bytes."""
+    return hashlib.sha1(data).hexdigest()[:20]
+
+
+def is_valid_tile(z, x, y):
+    """Checks that z/x/y address an existing tile in the web mercator grid."""
+    if not 0 <= z <= MAX_ZOOM:
+        return False
+    n = 1 << z
+    return 0 <= x < n and 0 <= y < n
+
+
+def lonlat_to_tile(lon, lat, z):
+    """Converts a longitude/latitude to the x/y tile containing it at zoom z."""
+    lat = max(min(lat, 85.0511), -85.0511)  # Web mercator limits
+    n = 1 << z
+    x = int((lon + 180.0) / 360.0 * n)
+    lat_rad = math.radians(lat)
+    y = int((1.0 - math.asinh(math.tan(lat_rad)) / math.pi) / 2.0 * n)
+    return min(max(x, 0), n - 1), min(max(y, 0), n - 1)
+
+
+def tiles_in_bbox(min_lon, min_lat, max_lon, max_lat, zooms):
+    """Yields every (z, x, y) tile covering the bounding box at the given zooms."""
+    for z in zooms:
+        x0, y0 = lonlat_to_tile(min_lon, max_lat, z)  # North-west corner
+        x1, y1 = lonlat_to_tile(max_lon, min_lat, z)  # South-east corner
+        for x in range(x0, x1 + 1):
+            for y in range(y0, y1 + 1):
+                yield z, x, y
+
+
+class _PendingFetch:
+    """An upstream fetch in flight that other requests for the same tile wait on."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class TileCache:
+    """Size-bounded LRU cache of map tiles stored under cache_dir/<z>/<x>/<y>.png."""
+
+    def __init__(self, cache_dir, max_bytes, upstream_url=DEFAULT_UPSTREAM_URL, timeout=10):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.upstream_url = upstream_url
+        self.timeout = timeout
+        self.total_bytes = 0
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # (z, x, y) -> [size, etag], least recently used first
+        self._pending = {}  # (z, x, y) -> _PendingFetch
+        os.makedirs(cache_dir, exist_ok=True)
+        self._load_index()
+
+    def _path(self, key):
+        z, x, y = key
+        return os.path.join(self.cache_dir, str(z), str(x), f'{y}.png')
+
+    def _load_index(self):
+        """Rebuilds the LRU index from the files on disk, oldest access first."""
+        found = []
+        for root, _dirs, files in os.walk(self.cache_dir):
+            for name in files:
+                path = os.path.join(root, name)
+                rel = os.path.relpath(path, self.cache_dir).split(os.sep)
+                if len(rel) != 3 or not name.endswith('.png'):
+                    continue
+                try:
+                    key = (int(rel[0]), int(rel[1]), int(name[:-4]))
+                    stat = os.stat(path)
+                except (ValueError, OSError):
+                    continue
+                found.append((stat.st_mtime, key, stat.st_size))
+
+        found.sort()
+        for _mtime, key, size in found:
+            self._entries[key] = [size, None]  # ETag is computed on first read
+            self.total_bytes += size
+        self._evict()
+        logger.info(f"Tile cache loaded {len(self._entries)} tiles ({self.total_bytes} bytes) from {self.cache_dir}")
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return tuple(key) in self._entries
+
+    def get(self, z, x, y):
+        """Returns (data, etag) for a tile, fetching it upstream on a miss."""
+        key = (z, x, y)
+        cached = self._read_cached(key)
+        if cached is not None:
+            return cached
+        return self._fetch_coalesced(key)
+
+    def _read_cached(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                entry = self._adopt(key)
+                if entry is None:
+                    return None
+            self._entries.move_to_end(key)
+            etag = entry[1]
+
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+            os.utime(path)  # Keep the on-disk LRU order across restarts
+        except FileNotFoundError:
+            # Removed behind our back; forget it and fetch again
+            with self._lock:
+                entry = self._entries.pop(key, None)
+                if entry is not None:
+                    self.total_bytes -= entry[0]
+            return None
+
+        if etag is None:
+            etag = tile_etag(data)
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None:
+                    entry[1] = etag
+        return data, etag
+
+    def _adopt(self, key):
+        """Indexes a tile written by another process (e.g. a prewarm run) sharing cache_dir.
+
+        Caller holds the lock. Returns the new entry, or None if the tile isn't on disk.
+        """
+        try:
+            size = os.stat(self._path(key)).st_size
+        except OSError:
+            return None
+        entry = self._entries[key] = [size, None]  # ETag is computed on first read
+        self.total_bytes += size
+        self._evict()
+        return self._entries.get(key)
+
+    def _fetch_coalesced(self, key):
+        """Fetches a missing tile, letting concurrent callers share one upstream request."""
+        with self._lock:
+            pending = self._pending.get(key)
+            is_leader = pending is None
+            if is_leader:
+                if key in self._entries:
+                    # Another fetch finished between our cache check and now
+                    pending = None
+                else:
+                    pending = self._pending[key] = _PendingFetch()
+
+        if pending is None:
+            return self.get(*key)
+
+        if not is_leader:
+            pending.done.wait()
+            if pending.error is not None:
+                raise pending.error
+            return pending.result
+
+        try:
+            data = self._fetch_upstream(key)
+            etag = tile_etag(data)
+            try:
+                self._store(key, data, etag)
+            except OSError as e:
+                # The tile is still good to serve, it just won't be cached
+                logger.warning(f"Failed to cache tile {key}: {e}")
+            pending.result = (data, etag)
+            return pending.result
+        except Exception as e:
+            # Waiters must see the same failure as the request that fetched for them
+            pending.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._pending[key]
+            pending.done.set()
+
+    def _fetch_upstream(self, key):
+        z, x, y = key
+        url = self.upstream_url.format(z=z, x=x, y=y)
+        req = urllib.request.Request(url, headers={'User-Agent': USER_AGENT})
+        try:
+            with urllib.request.urlopen(req, timeout=self.timeout) as response:
+                content_type = response.headers.get('Content-Type')
+                data = response.read()
+        except (urllib.error.URLError, OSError) as e:
+            raise TileFetchError(f"Failed to fetch tile {z}/{x}/{y} from upstream: {e}") from e
+        # Error and rate limit pages can come back as 200 with HTML; don't cache them as tiles
+        if content_type is not None and not content_type.lower().startswith('image/'):
+            raise TileFetchError(f"Upstream returned {content_type} instead of an image for {z}/{x}/{y}")
+        if not data:
+            raise TileFetchError(f"Upstream returned an empty tile for {z}/{x}/{y}")
+        return data
+
+    def _store(self, key, data, etag):
+        """Writes a tile to disk atomically and evicts old tiles if over budget."""
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f'{path}.{threading.get_ident()}.tmp'
+        try:
+            with open(tmp_path, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except OSError:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            raise
+
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.total_bytes -= old[0]
+            self._entries[key] = [len(data), etag]
+            self.total_bytes += len(data)
+            self._evict()
+
+    def _evict(self):
+        """Drops least recently used tiles until the cache fits max_bytes. Caller holds the lock."""
+        while self.total_bytes > self.max_bytes and len(self._entries) > 1:
+            key, (size, _etag) = self._entries.popitem(last=False)
+            self.total_bytes -= size
+            try:
+                os.remove(self._path(key))
+            except FileNotFoundError:
+                pass
+            logger.debug(f"Evicted tile {key} from cache")
+
+    def prewarm(self, min_lon, min_lat, max_lon, max_lat, zooms, max_tiles=None):
+        """Fetches every tile in the bounding box that is not cached yet.
+
+        Returns a (fetched, skipped, failed) tuple of tile counts.
+        """
+        tiles = list(tiles_in_bbox(min_lon, min_lat, max_lon, max_lat, zooms))
+        if max_tiles is not None and len(tiles) > max_tiles:
+            raise ValueError(f"Bounding box covers {len(tiles)} tiles, more than the limit of {max_tiles}")
+
+        fetched = skipped = failed = 0
+        for key in tiles:
+            if key in self:
+                skipped += 1
+                continue
+            try:
+                self.get(*key)
+                fetched += 1
+            except TileFetchError as e:
+                logger.warning(str(e))
+                failed += 1
+        return fetched, skipped, failed
+
+
+def parse_zooms(value):
+    """Parses '15' or '12-17' into a list of zoom levels."""
+    start, _, end = value.partition('-')
+    zooms = list(range(int(start), int(end or start) + 1))
+    if not zooms or zooms[0] < 0 or zooms[-1] > MAX_ZOOM:
+        raise argparse.ArgumentTypeError(f"Zoom range must be within 0-{MAX_ZOOM}")
+    return zooms
+
+
+def parse_bbox(value):
+    """Parses 'min_lon,min_lat,max_lon,max_lat' into a tuple of floats."""
+    try:
+        min_lon, min_lat, max_lon, max_lat = (float(v) for v in value.split(','))
+    except ValueError:
+        raise argparse.ArgumentTypeError("Bounding box must be min_lon,min_lat,max_lon,max_lat")
+    if min_lon > max_lon or min_lat > max_lat:
+        raise argparse.ArgumentTypeError("Bounding box minimums must not exceed maximums")
+    return min_lon, min_lat, max_lon, max_lat
+
+
+def main(argv=None):
+    """Command line entry point for pre-warming the tile cache."""
+    from config import get_config
+
+    config = get_config()
+    parser = argparse.ArgumentParser(description="SimpleMeet tile cache tools")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    prewarm_parser = subparsers.add_parser('prewarm', help="Fetch all tiles in a bounding box into the cache")
+    prewarm_parser.add_argument('--bbox', type=parse_bbox, required=True,
+                                help="min_lon,min_lat,max_lon,max_lat")
+    prewarm_parser.add_argument('--zooms', type=parse_zooms, default=parse_zooms('12-17'),
+                                help="Zoom level or range, e.g. 15 or 12-17 (default: 12-17)")
+    prewarm_parser.add_argument('--cache-dir', default=config.TILE_CACHE_DIR)
+    prewarm_parser.add_argument('--max-mb', type=int, default=config.TILE_CACHE_MAX_MB)
+    prewarm_parser.add_argument('--upstream', default=config.TILE_UPSTREAM_URL)
+    prewarm_parser.add_argument('--max-tiles', type=int, default=5000,
+                                help="Refuse bounding boxes covering more tiles than this (default: 5000)")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    cache = TileCache(args.cache_dir, args.max_mb * 1024 * 1024, args.upstream)
+    try:
+        fetched, skipped, failed = cache.prewarm(*args.bbox, args.zooms, max_tiles=args.max_tiles)
+    except ValueError as e:
+        parser.error(str(e))
+    print(f"Pre-warmed tile cache: {fetched} fetched, {skipped} already cached, {failed} failed")
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())